@@ -0,0 +1,456 @@
+"""Binary decision diagrams
+
+A reduced ordered binary decision diagram (BDD) to represent constraints from :mod:`expressions`
+compactly and to count their solutions exactly, in time linear in the size of the diagram instead
+of the size of the assignment space.
+
+Literature
+----------
+- Bryant (1986): "Graph-Based Algorithms for Boolean Function Manipulation"
+- Brace et al. (1990): "Efficient Implementation of a BDD Package"
+- Een & Sorensson (2006): "Translating Pseudo-Boolean Constraints into SAT"
+- Rudell (1993): "Dynamic Variable Ordering for Ordered Binary Decision Diagrams"
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import expressions as expr
+
+
+class BDD:
+    """Reduced ordered binary decision diagram
+
+    Manages the nodes of multiple diagrams over the same decision variables, which are identified
+    by their index (see :class:`expressions.Variable`) and tested in a fixed order (levels) in all
+    diagrams. Nodes are identified by integers; :attr:`FALSE` and :attr:`TRUE` are the terminal
+    nodes. Nodes are unique, i.e., two equivalent boolean functions are represented by the same
+    node.
+    """
+
+    FALSE = 0
+    TRUE = 1
+
+    def __init__(self, num_variables: int, variable_order: Optional[Sequence[int]] = None):
+        """Initialize diagram
+
+        Parameters
+        ----------
+        num_variables : int
+            Number of decision variables, which have the indices 0 to `num_variables - 1`.
+        variable_order : Optional[Sequence[int]], optional
+            Indices of all decision variables, in the order in which the diagrams should test them.
+            The order strongly influences the size of diagrams. If None, variables are ordered by
+            their index.
+        """
+
+        self.num_variables = num_variables
+        if variable_order is None:
+            variable_order = range(num_variables)
+        self.variable_levels = {index: level for level, index in enumerate(variable_order)}
+        assert len(self.variable_levels) == num_variables
+        self.levels = [num_variables, num_variables]  # terminals are below all variables
+        self.lows = [BDD.FALSE, BDD.TRUE]
+        self.highs = [BDD.FALSE, BDD.TRUE]
+        self.unique_table = {}  # map (level, low, high) to node
+        self.ite_cache = {}  # map (f, g, h) to node
+
+    def make_node(self, level: int, low: int, high: int) -> int:
+        """Get (or create) node
+
+        Parameters
+        ----------
+        level : int
+            Level of the decision variable tested at the node.
+        low : int
+            Child node if the variable is false.
+        high : int
+            Child node if the variable is true.
+
+        Returns
+        -------
+        int
+            The (unique) node. If both children are the same, this child is returned.
+        """
+
+        if low == high:  # variable does not matter
+            return low
+        key = (level, low, high)
+        node = self.unique_table.get(key)
+        if node is None:
+            node = len(self.levels)
+            self.levels.append(level)
+            self.lows.append(low)
+            self.highs.append(high)
+            self.unique_table[key] = node
+        return node
+
+    def variable(self, level: int) -> int:
+        """Get node representing a decision variable
+
+        Parameters
+        ----------
+        level : int
+            Level of the decision variable (its position in the variable order).
+
+        Returns
+        -------
+        int
+            The node, which evaluates to true if and only if the variable is true.
+        """
+
+        return self.make_node(level, BDD.FALSE, BDD.TRUE)
+
+    def ite(self, f: int, g: int, h: int) -> int:
+        """If-then-else
+
+        Combines three diagrams to "if f then g else h", which allows to express all binary
+        boolean operators.
+
+        Parameters
+        ----------
+        f : int
+            Node representing the condition.
+        g : int
+            Node representing the result if the condition is true.
+        h : int
+            Node representing the result if the condition is false.
+
+        Returns
+        -------
+        int
+            Node representing the combined diagram.
+        """
+
+        result = self.get_ite_result(f, g, h)
+        if result is not None:
+            return result
+        # Iterative post-order traversal, as recursion depth would grow with number of variables.
+        # Frames: key, level of Shannon expansion, keys of cofactor combinations, their results
+        levels, get_ite_result, cofactors = self.levels, self.get_ite_result, self.cofactors
+        stack = [[(f, g, h), None, None, None, None, None]]
+        while True:
+            frame = stack[-1]
+            key, level, low_key, high_key, low, high = frame
+            if level is None:  # Shannon expansion at top-most variable of the three diagrams
+                f, g, h = key
+                level = min(levels[f], levels[g], levels[h])
+                f_low, f_high = cofactors(f, level)
+                g_low, g_high = cofactors(g, level)
+                h_low, h_high = cofactors(h, level)
+                low_key, high_key = (f_low, g_low, h_low), (f_high, g_high, h_high)
+                frame[1:4] = level, low_key, high_key
+            if low is None:
+                low = frame[4] = get_ite_result(*low_key)
+                if low is None:
+                    stack.append([low_key, None, None, None, None, None])
+                    continue
+            if high is None:
+                high = frame[5] = get_ite_result(*high_key)
+                if high is None:
+                    stack.append([high_key, None, None, None, None, None])
+                    continue
+            stack.pop()
+            result = self.make_node(level, low, high)
+            self.ite_cache[key] = result
+            if len(stack) == 0:
+                return result
+            parent = stack[-1]  # waits for this result (cofactor combinations solved in order)
+            parent[4 if parent[4] is None else 5] = result
+
+    def get_ite_result(self, f: int, g: int, h: int) -> Optional[int]:
+        """Get result of if-then-else if it is known
+
+        Sub-routine of :meth:`ite`.
+
+        Parameters
+        ----------
+        f : int
+            Node representing the condition.
+        g : int
+            Node representing the result if the condition is true.
+        h : int
+            Node representing the result if the condition is false.
+
+        Returns
+        -------
+        Optional[int]
+            Node representing the combined diagram if the combination is a terminal case or was
+            computed before, else None.
+        """
+
+        if f == BDD.TRUE:
+            return g
+        if f == BDD.FALSE:
+            return h
+        if g == h:
+            return g
+        if (g == BDD.TRUE) and (h == BDD.FALSE):
+            return f
+        return self.ite_cache.get((f, g, h))
+
+    def cofactors(self, node: int, level: int) -> Tuple[int, int]:
+        """Get cofactors
+
+        Parameters
+        ----------
+        node : int
+            Root of the diagram.
+        level : int
+            Level of a decision variable. Should not be below the level of the node.
+
+        Returns
+        -------
+        Tuple[int, int]
+            The diagram if the variable is false and if it is true.
+        """
+
+        if self.levels[node] == level:
+            return self.lows[node], self.highs[node]
+        return node, node  # node does not depend on variable
+
+    def negate(self, f: int) -> int:
+        return self.ite(f, BDD.FALSE, BDD.TRUE)
+
+    def conjoin(self, nodes: Sequence[int]) -> int:
+        result = BDD.TRUE
+        for node in nodes:
+            result = self.ite(result, node, BDD.FALSE)
+        return result
+
+    def disjoin(self, nodes: Sequence[int]) -> int:
+        result = BDD.FALSE
+        for node in nodes:
+            result = self.ite(result, BDD.TRUE, node)
+        return result
+
+    def compile(self, expression: expr.BooleanExpression) -> int:
+        """Compile expression into diagram
+
+        Recursively translates the expression tree. Comparisons between a (weighted) sum and a
+        numeric value are translated natively (see :meth:`compile_linear`); all other expression
+        types not known to this method are translated from their truth table.
+
+        Parameters
+        ----------
+        expression : expr.BooleanExpression
+            A boolean expression whose variables have indices.
+
+        Returns
+        -------
+        int
+            Node representing the expression.
+        """
+
+        def is_default(expression_type: type) -> bool:
+            return expr.has_default_evaluation(expression, expression_type)
+
+        if isinstance(expression, expr.CompiledExpression):
+            return self.compile(expression.bool_expression)
+        if is_default(expr.Variable) and (expression.index is not None):
+            return self.variable(self.variable_levels[expression.index])
+        if is_default(expr.BooleanValue) and not isinstance(expression, expr.Variable):
+            return BDD.TRUE if expression.is_true() else BDD.FALSE
+        if is_default(expr.And):
+            return self.conjoin([self.compile(x) for x in expression.bool_expressions])
+        if is_default(expr.Or):
+            return self.disjoin([self.compile(x) for x in expression.bool_expressions])
+        if is_default(expr.Not):
+            return self.negate(self.compile(expression.bool_expression))
+        if is_default(expr.Implies):
+            return self.ite(self.compile(expression.bool_expression1),
+                            self.compile(expression.bool_expression2), BDD.TRUE)
+        if is_default(expr.Xor):
+            node2 = self.compile(expression.bool_expression2)
+            return self.ite(self.compile(expression.bool_expression1), self.negate(node2), node2)
+        if is_default(expr.Iff):
+            nodes = [self.compile(x) for x in expression.bool_expressions]
+            return self.ite(self.conjoin(nodes), BDD.TRUE, self.negate(self.disjoin(nodes)))
+        if is_default(expr.Eq) or is_default(expr.Ge) or is_default(expr.Le):
+            result = self.compile_linear(expression)
+            if result is not None:
+                return result
+        return self.compile_truth_table(expression)
+
+    def compile_linear(self, expression: expr.BooleanExpression) -> int:
+        """Compile linear comparison into diagram
+
+        Translates comparisons ("==", ">=", "<=") between a sum or weighted sum of boolean
+        expressions and a numeric value. Instead of enumerating all combinations of operands, the
+        diagram is built layer by layer over the operands, merging partial sums that are equal and
+        stopping as soon as the comparison is decided for all completions of a partial sum. Thus,
+        the size of the diagram for cardinality constraints is polynomial. Operands are summed in
+        their original order, so the result coincides with scalar evaluation also for
+        floating-point weights.
+
+        Parameters
+        ----------
+        expression : expr.BooleanExpression
+            An expression of type :class:`expressions.Eq`, :class:`expressions.Ge`, or
+            :class:`expressions.Le`.
+
+        Returns
+        -------
+        int
+            Node representing the expression, or None if the operands of the comparison are not
+            a (weighted) sum and a numeric value.
+        """
+
+        operator = {expr.Eq: '==', expr.Ge: '>=', expr.Le: '<='}[
+            next(x for x in (expr.Eq, expr.Ge, expr.Le) if isinstance(expression, x))]
+        arith1, arith2 = expression.arith_expression1, expression.arith_expression2
+        if isinstance(arith1, expr.NumericValue) and not isinstance(arith2, expr.NumericValue):
+            arith1, arith2 = arith2, arith1
+            operator = {'==': '==', '>=': '<=', '<=': '>='}[operator]
+        if not isinstance(arith2, expr.NumericValue):
+            return None
+        if type(arith1) is expr.Sum:
+            terms = [(x, 1) for x in arith1.bool_expressions]
+        elif type(arith1) is expr.WeightedSum:
+            terms = list(zip(arith1.bool_expressions, arith1.weights))
+        else:
+            return None
+        threshold = arith2.get_value()
+
+        def compare(value: float) -> bool:
+            if operator == '==':
+                return value == threshold
+            if operator == '>=':
+                return value >= threshold
+            return value <= threshold
+
+        # Range of sums that remaining terms can add (suffix sums of negative/positive weights):
+        min_rest = [0] * (len(terms) + 1)
+        max_rest = [0] * (len(terms) + 1)
+        for i in range(len(terms) - 1, -1, -1):
+            min_rest[i] = min_rest[i + 1] + min(terms[i][1], 0)
+            max_rest[i] = max_rest[i + 1] + max(terms[i][1], 0)
+
+        def decide(i: int, partial_sum: float) -> int:  # None if comparison still undecided
+            if i == len(terms):
+                return BDD.TRUE if compare(partial_sum) else BDD.FALSE
+            if (operator == '<=') and (partial_sum + max_rest[i] <= threshold):
+                return BDD.TRUE
+            if (operator == '>=') and (partial_sum + min_rest[i] >= threshold):
+                return BDD.TRUE
+            if (operator in ('<=', '==')) and (partial_sum + min_rest[i] > threshold):
+                return BDD.FALSE
+            if (operator in ('>=', '==')) and (partial_sum + max_rest[i] < threshold):
+                return BDD.FALSE
+            return None
+
+        # Forward pass: determine undecided partial sums before each term
+        layers: List[Dict[float, int]] = [{0: None}]
+        for i, (_, weight) in enumerate(terms):
+            next_layer = {}
+            for partial_sum in layers[-1]:
+                if decide(i, partial_sum) is None:
+                    next_layer[partial_sum] = None
+                    next_layer[partial_sum + weight] = None
+            layers.append(next_layer)
+        # Backward pass: build nodes, starting from the last term
+        term_nodes = [self.compile(x) for (x, _) in terms]
+        for i in range(len(terms), -1, -1):
+            for partial_sum in layers[i]:
+                node = decide(i, partial_sum)
+                if node is None:
+                    low = layers[i + 1][partial_sum]
+                    high = layers[i + 1][partial_sum + terms[i][1]]
+                    node = self.ite(term_nodes[i], high, low)
+                layers[i][partial_sum] = node
+        return layers[0][0]
+
+    def compile_truth_table(self, expression: expr.BooleanExpression) -> int:
+        """Compile expression into diagram via its truth table
+
+        Evaluates the expression for all assignments to its involved variables (vectorized, see
+        :meth:`expressions.BooleanExpression.is_true_batch`) and builds the diagram bottom-up.
+        Serves as a fallback for expression types without a dedicated translation; its cost is
+        exponential in the number of involved variables.
+
+        Parameters
+        ----------
+        expression : expr.BooleanExpression
+            A boolean expression whose variables have indices.
+
+        Returns
+        -------
+        int
+            Node representing the expression.
+        """
+
+        indices = sorted(set(x.index for x in expr.get_involved_variables(expression)),
+                         key=lambda x: self.variable_levels[x])
+        levels = [self.variable_levels[x] for x in indices]
+        packed_assignments = np.arange(2 ** len(levels), dtype=np.uint64)
+        assignments = np.zeros((len(packed_assignments), self.num_variables), dtype=bool,
+                               order='F')
+        for i, index in enumerate(indices):  # top-most variable is most significant bit
+            shift = np.uint64(len(indices) - 1 - i)
+            assignments[:, index] = (packed_assignments >> shift) & np.uint64(1)
+        nodes = [BDD.TRUE if x else BDD.FALSE for x in expression.is_true_batch(assignments)]
+        for level in reversed(levels):  # merge pairs of assignments differing in last variable
+            nodes = [self.make_node(level, nodes[j], nodes[j + 1])
+                     for j in range(0, len(nodes), 2)]
+        return nodes[0]
+
+    def count_models(self, node: int) -> int:
+        """Count satisfying assignments
+
+        Parameters
+        ----------
+        node : int
+            Root of the diagram.
+
+        Returns
+        -------
+        int
+            Number of assignments to all decision variables for which the diagram evaluates to
+            true, in [0, 2^n].
+        """
+
+        # Counts relative to the level of a node; children have been created before parents, so
+        # iterating nodes in the order of creation respects dependencies
+        counts = [0, 1]
+        for current in range(2, node + 1):
+            level = self.levels[current]
+            low, high = self.lows[current], self.highs[current]
+            counts.append(counts[low] * 2 ** (self.levels[low] - level - 1) +
+                          counts[high] * 2 ** (self.levels[high] - level - 1))
+        return counts[node] * 2 ** self.levels[node]
+
+
+def get_variable_order(constraints: Sequence[expr.BooleanExpression],
+                       num_variables: int) -> Sequence[int]:
+    """Get variable order for diagrams
+
+    Static ordering heuristic that places variables occurring in the same constraint close to each
+    other: Orders variables by their first occurrence in the constraints, considering constraints
+    with more variables first. Constraints involving more than half of all variables are ignored,
+    as they do not indicate locality. Remaining variables keep the order of their indices.
+
+    Parameters
+    ----------
+    constraints : Sequence[expr.BooleanExpression]
+        The constraints. Their variables need indices.
+    num_variables : int
+        Total number of decision variables.
+
+    Returns
+    -------
+    Sequence[int]
+        Indices of all decision variables, in the order in which diagrams should test them.
+    """
+
+    constraint_variables = [[x.index for x in expr.get_involved_variables(constraint)]
+                            for constraint in constraints]
+    result = {}  # dicts keep insertion order and allow constant-time membership checks
+    for indices in sorted(constraint_variables, key=lambda x: -len(set(x))):
+        if len(set(indices)) > num_variables / 2:
+            continue
+        for index in indices:
+            result.setdefault(index, None)
+    for index in range(num_variables):
+        result.setdefault(index, None)
+    return list(result)
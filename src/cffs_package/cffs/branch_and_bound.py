@@ -0,0 +1,369 @@
+"""Branch and bound for linear constraints
+
+A dedicated optimizer for constrained feature selection if all constraints are linear over the
+decision variables (like cardinality and pseudo-boolean constraints, see
+:func:`expressions.get_linear_constraints`). Maximizes a linear objective with depth-first branch
+and bound, which avoids the overhead of a general SMT solver (see :mod:`combi_solving`).
+
+Literature
+----------
+- Bach et al. (2022): "An Empirical Evaluation of Constrained Feature Selection"
+- Kellerer et al. (2004): "Knapsack Problems"
+- Land & Doig (1960): "An Automatic Method of Solving Discrete Programming Problems"
+- Lynce & Marques-Silva (2003): "Probing-Based Preprocessing Techniques for Propositional
+  Satisfiability"
+"""
+
+import fractions
+import math
+import time
+from typing import List, Optional, Sequence
+
+from . import expressions as expr
+
+
+MAX_NODES = 10 ** 5  # number of search nodes after which the search is aborted by default
+TIME_CHECK_NODES = 100  # number of search nodes between checks of the time limit
+
+
+class BranchAndBound:
+    """Branch-and-bound optimizer
+
+    Maximizes "q_1 * x_1 + ... + q_n * x_n" over boolean decision variables "x" under linear
+    constraints. Branches on the open variables in the order of their index (ideally, sorted by
+    decreasing quality), trying the value that increases the objective first, so the first
+    solution found is a greedy one. After each branching decision, fixes variables whose other
+    value would violate a constraint, given the minimum and maximum contribution of the open
+    variables (unit propagation); before the search, also fixes variables whose value leads to a
+    violation by propagation (failed-literal probing). Sub-trees are pruned if a constraint cannot
+    be satisfied anymore or if an upper bound on the objective does not exceed the best solution
+    found so far. The upper bound is the minimum over the LP relaxations of the single constraints
+    with non-negative weights and an upper limit (fractional knapsack, solved greedily), besides
+    the sum of the positive qualities of the open variables.
+    """
+
+    def __init__(self, qualities: Sequence[float],
+                 linear_constraints: Sequence[expr.LinearConstraint]):
+        """Initialize optimizer
+
+        Parameters
+        ----------
+        qualities : Sequence[float]
+            Weights of the decision variables in the objective, where the position corresponds to
+            the index of the variable.
+        linear_constraints : Sequence[expr.LinearConstraint]
+            The constraints, which are combined by AND.
+        """
+
+        num_variables = len(qualities)
+        self.qualities = list(qualities)
+        self.constraints = list(linear_constraints)
+        self.variable_terms = [[] for _ in range(num_variables)]  # (constraint position, weight)
+        for position, constraint in enumerate(self.constraints):
+            for variable_idx, weight in constraint.weights.items():
+                self.variable_terms[variable_idx].append((position, weight))
+        self.max_weights = [max((abs(w) for w in x.weights.values()), default=0)
+                            for x in self.constraints]
+        # Constraints for the knapsack bound, with their variables of positive quality, sorted by
+        # decreasing ratio of quality to weight:
+        self.knapsack_constraints = []
+        for position, constraint in enumerate(self.constraints):
+            if constraint.upper < math.inf and all(w >= 0 for w in constraint.weights.values()):
+                variables = sorted(
+                    (i for i, w in constraint.weights.items() if self.qualities[i] > 0),
+                    key=lambda i: (-math.inf if constraint.weights[i] == 0 else
+                                   -self.qualities[i] / constraint.weights[i], i))
+                self.knapsack_constraints.append((position, variables))
+        # Search state (changes with assignments):
+        self.values = [None] * num_variables  # None for open variables
+        self.trail = []  # assigned variables, in the order of assignment
+        self.sums = [0] * len(self.constraints)  # weighted sum of variables assigned true
+        self.open_min = [sum(min(w, 0) for w in x.weights.values()) for x in self.constraints]
+        self.open_max = [sum(max(w, 0) for w in x.weights.values()) for x in self.constraints]
+        self.value = 0  # objective value of variables assigned true
+        self.open_positive = sum(max(q, 0) for q in self.qualities)
+        self.num_nodes = 0
+        self.status = None  # result of last optimization: "optimal", "infeasible", or "aborted"
+
+    def assign(self, variable_idx: int, value: bool) -> None:
+        """Assign value to open variable
+
+        Parameters
+        ----------
+        variable_idx : int
+            Index of the variable.
+        value : bool
+            Value of the variable.
+        """
+
+        self.values[variable_idx] = value
+        self.trail.append(variable_idx)
+        for position, weight in self.variable_terms[variable_idx]:
+            if weight > 0:
+                self.open_max[position] -= weight
+            else:
+                self.open_min[position] -= weight
+            if value:
+                self.sums[position] += weight
+        self.open_positive -= max(self.qualities[variable_idx], 0)
+        if value:
+            self.value += self.qualities[variable_idx]
+
+    def backtrack(self, trail_length: int) -> None:
+        """Undo assignments
+
+        Parameters
+        ----------
+        trail_length : int
+            Number of assignments to keep, i.e., all later assignments are undone.
+        """
+
+        while len(self.trail) > trail_length:
+            variable_idx = self.trail.pop()
+            value = self.values[variable_idx]
+            self.values[variable_idx] = None
+            for position, weight in self.variable_terms[variable_idx]:
+                if weight > 0:
+                    self.open_max[position] += weight
+                else:
+                    self.open_min[position] += weight
+                if value:
+                    self.sums[position] -= weight
+            self.open_positive += max(self.qualities[variable_idx], 0)
+            if value:
+                self.value -= self.qualities[variable_idx]
+
+    def propagate(self, variable_indices: Sequence[int]) -> bool:
+        """Propagate assignments
+
+        Checks the constraints involving the recently assigned variables and assigns open
+        variables whose other value would violate a constraint, until no more variables are
+        assigned.
+
+        Parameters
+        ----------
+        variable_indices : Sequence[int]
+            Indices of the recently assigned variables.
+
+        Returns
+        -------
+        bool
+            False if a constraint cannot be satisfied anymore (conflict), else True.
+        """
+
+        queue = list(variable_indices)
+        while len(queue) > 0:
+            for position, _ in self.variable_terms[queue.pop()]:
+                constraint = self.constraints[position]
+                lower = self.sums[position] + self.open_min[position]  # range of achievable sums
+                upper = self.sums[position] + self.open_max[position]
+                if lower > constraint.upper or upper < constraint.lower:
+                    return False
+                if (lower + self.max_weights[position] <= constraint.upper and
+                        upper - self.max_weights[position] >= constraint.lower):
+                    continue  # no variable can be forced
+                for variable_idx, weight in constraint.weights.items():
+                    if self.values[variable_idx] is not None or weight == 0:
+                        continue
+                    if weight > 0:
+                        can_be_true = lower + weight <= constraint.upper
+                        can_be_false = upper - weight >= constraint.lower
+                    else:
+                        can_be_true = upper + weight >= constraint.lower
+                        can_be_false = lower - weight <= constraint.upper
+                    if not can_be_true or not can_be_false:
+                        self.assign(variable_idx, can_be_true)
+                        queue.append(variable_idx)
+                        # Range of achievable sums changes for the constraint at hand; it is
+                        # checked again when processing the queued variable
+        return True
+
+    def probe(self) -> bool:
+        """Fix variables by failed-literal probing
+
+        Tentatively assigns each open variable both values and propagates; if one value leads to
+        a conflict, permanently assigns the other value. Repeats until no variable gets fixed.
+
+        Returns
+        -------
+        bool
+            False if the constraints cannot be satisfied, else True.
+        """
+
+        changed = True
+        while changed:
+            changed = False
+            for variable_idx in range(len(self.values)):
+                if self.values[variable_idx] is not None or not self.variable_terms[variable_idx]:
+                    continue
+                feasible_values = []
+                for value in (True, False):
+                    trail_length = len(self.trail)
+                    self.assign(variable_idx, value)
+                    if self.propagate([variable_idx]):
+                        feasible_values.append(value)
+                    self.backtrack(trail_length)
+                if len(feasible_values) == 0:
+                    return False
+                if len(feasible_values) == 1:
+                    self.assign(variable_idx, feasible_values[0])
+                    if not self.propagate([variable_idx]):
+                        return False
+                    changed = True
+        return True
+
+    def get_bound(self, threshold: float) -> float:
+        """Compute upper bound on the objective
+
+        Parameters
+        ----------
+        threshold : float
+            Objective value of the best solution so far. Computation stops early once the bound
+            does not exceed this value.
+
+        Returns
+        -------
+        float
+            An upper bound on the objective value of all solutions extending the current
+            assignment.
+        """
+
+        bound = self.value + self.open_positive
+        for position, variables in self.knapsack_constraints:
+            if bound <= threshold:
+                break
+            capacity = self.constraints[position].upper - self.sums[position]
+            weights = self.constraints[position].weights
+            constraint_bound = self.value + self.open_positive  # relax other constraints
+            for i in variables:
+                if self.values[i] is not None:
+                    continue
+                if weights[i] <= capacity:
+                    capacity -= weights[i]
+                else:  # take fraction of variable (following variables get excluded completely)
+                    constraint_bound -= self.qualities[i] * (1 - capacity / weights[i])
+                    capacity = 0
+            bound = min(bound, constraint_bound)
+        return bound
+
+    def compute_upper_bound(self) -> float:
+        """Compute upper bound on the optimal objective value
+
+        Propagates the constraints without branching and computes the bound of
+        :meth:`get_bound`, which is much cheaper than :meth:`optimize`. Valid for any problem
+        whose constraints imply the linear constraints at hand, e.g., a problem with further
+        (non-linear) constraints.
+
+        Returns
+        -------
+        float
+            An upper bound on the objective value of all solutions, or -inf if propagation shows
+            that the constraints cannot be satisfied.
+        """
+
+        self.backtrack(0)
+        bound = -math.inf
+        if (all(x.lower <= 0 <= x.upper for x in self.constraints if len(x.weights) == 0) and
+                self.propagate(range(len(self.qualities))) and self.probe()):
+            bound = self.get_bound(-math.inf)  # no early stopping
+        self.backtrack(0)
+        return bound
+
+    def optimize(self, max_nodes: Optional[int] = MAX_NODES,
+                 time_limit: Optional[float] = None) -> Optional[List[int]]:
+        """Find optimal solution
+
+        Sets :attr:`status` to "optimal" if an optimal solution was found, "infeasible" if the
+        constraints cannot be satisfied, or "aborted" if the node limit or time limit was reached
+        first.
+
+        Parameters
+        ----------
+        max_nodes : Optional[int], optional
+            Maximum number of search nodes (branching decisions). If None, search exhaustively.
+        time_limit : Optional[float], optional
+            Maximum runtime of the search in seconds (checked every :data:`TIME_CHECK_NODES`
+            nodes). If None, no time limit.
+
+        Returns
+        -------
+        Optional[List[int]]
+            The indices of the variables that are true in the best solution found, or None if no
+            solution was found.
+        """
+
+        num_variables = len(self.qualities)
+        self.backtrack(0)
+        best = {'value': -math.inf, 'values': None}
+        self.num_nodes = 0
+        self.status = 'optimal'
+        end_time = None if time_limit is None else time.perf_counter() + time_limit
+
+        # Search path (iterative depth-first search, as the path may be as long as the number of
+        # variables): variable branched on, trail length before branching, values left to try
+        stack = []
+
+        def visit(k: int) -> None:  # branch on first open variable from k if node is not pruned
+            while k < num_variables and self.values[k] is not None:
+                k += 1
+            if k == num_variables:
+                if self.value > best['value']:
+                    best['value'] = self.value
+                    best['values'] = list(self.values)
+                return
+            if self.get_bound(best['value']) <= best['value']:
+                return
+            stack.append((k, len(self.trail),
+                          iter((True, False) if self.qualities[k] > 0 else (False, True))))
+
+        if (all(x.lower <= 0 <= x.upper for x in self.constraints if len(x.weights) == 0) and
+                self.propagate(range(num_variables)) and self.probe()):
+            visit(0)
+        while len(stack) > 0:
+            k, trail_length, values = stack[-1]
+            self.backtrack(trail_length)  # undo assignments of previous branch (if any)
+            value = next(values, None)
+            if value is None:
+                stack.pop()
+                continue
+            if ((max_nodes is not None and self.num_nodes >= max_nodes) or
+                    (end_time is not None and self.num_nodes % TIME_CHECK_NODES == 0 and
+                     time.perf_counter() > end_time)):
+                self.status = 'aborted'
+                break
+            self.num_nodes += 1
+            self.assign(k, value)
+            if self.propagate([k]):
+                visit(k + 1)
+        self.backtrack(0)
+        if best['values'] is None:
+            if self.status == 'optimal':
+                self.status = 'infeasible'
+            return None
+        return [i for i, x in enumerate(best['values']) if x]
+
+
+def compute_objective_value(qualities: Sequence[float], selected: Sequence[int]) -> float:
+    """Compute objective value exactly
+
+    Sums the qualities as exact decimal fractions (like Z3, which parses floats from their string
+    representation) and rounds only once, so the result equals the one of Z3 in
+    :mod:`combi_solving`.
+
+    Parameters
+    ----------
+    qualities : Sequence[float]
+        Weights of the decision variables in the objective.
+    selected : Sequence[int]
+        Indices of the variables that are true.
+
+    Returns
+    -------
+    float
+        The objective value (int if it is a whole number, like in :mod:`combi_solving`).
+    """
+
+    value = sum((fractions.Fraction(str(qualities[i])) for i in selected), fractions.Fraction(0))
+    if value.denominator == 1:
+        return value.numerator
+    return value.numerator / value.denominator
@@ -12,7 +12,7 @@ Literature
 """
 
 from abc import ABCMeta
-from typing import Sequence
+from typing import Any, Dict, List, Optional, Sequence
 
 import z3
 
@@ -26,18 +26,75 @@ class BooleanExpression(expr.BooleanExpression, metaclass=ABCMeta):
     :meth:`is_true`, defining an operator that combines all child expressions (operands).
     """
 
+    __slots__ = ()
+
     def get_z3(self) -> z3.BoolRef:
         """Get wrapped Z3 expression
 
+        The Z3 expression is created lazily, i.e., on the first call of this method (which also
+        creates the Z3 expressions of the child expressions, bottom-up), and cached afterwards.
+        Thus, expressions only used for counting (see :mod:`solving`) never allocate Z3 objects.
+
         Returns
         -------
         z3.BoolRef
             Get the Z3 representation of the expression. For this method to work, subclasses should
-            set the field :attr:`z3_expr`, ideally in their initializer.
+            initialize the field :attr:`z3_expr` with None and implement :meth:`create_z3`.
         """
 
+        if self.z3_expr is None:
+            self.z3_expr = self.create_z3()
         return self.z3_expr
 
+    def create_z3(self) -> z3.BoolRef:
+        """Create Z3 expression
+
+        Sub-routine of :meth:`get_z3`. Subclasses should implement this method by combining the Z3
+        expressions of their child expressions (obtained via :meth:`get_z3`).
+
+        Raises
+        ------
+        NotImplementedError
+            If not overridden.
+
+        Returns
+        -------
+        z3.BoolRef
+            The Z3 representation of the expression.
+        """
+
+        raise NotImplementedError('Abstract method.')
+
+    def __getstate__(self) -> dict:
+        """Get state for pickling
+
+        Z3 expressions cannot be pickled, so they are dropped; an unpickled expression re-creates
+        its Z3 expression on demand (see :meth:`get_z3`).
+
+        Returns
+        -------
+        dict
+            The attributes of the expression, with the Z3 expression set to None.
+        """
+
+        state = {name: getattr(self, name) for cls in type(self).__mro__
+                 for name in getattr(cls, '__slots__', ()) if hasattr(self, name)}
+        state.update(getattr(self, '__dict__', {}))  # subclasses without slots
+        state['z3_expr'] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        """Set state for unpickling
+
+        Parameters
+        ----------
+        state : dict
+            The attributes of the expression, as returned by :meth:`__getstate__`.
+        """
+
+        for name, value in state.items():
+            setattr(self, name, value)
+
 
 class BooleanValue(expr.BooleanValue, BooleanExpression):
     """Boolean value
@@ -46,9 +103,14 @@ class BooleanValue(expr.BooleanValue, BooleanExpression):
     child expressions.
     """
 
+    __slots__ = ('z3_expr',)
+
     def __init__(self, value: bool):
         super().__init__(value=value)
-        self.z3_expr = z3.BoolVal(value)
+        self.z3_expr = None  # created lazily
+
+    def create_z3(self) -> z3.BoolRef:
+        return z3.BoolVal(self.value)
 
 
 class Variable(expr.Variable, BooleanExpression):
@@ -58,9 +120,14 @@ class Variable(expr.Variable, BooleanExpression):
     optimization problem of constrained feature selection.
     """
 
-    def __init__(self, name: str):
-        super().__init__(name=name)
-        self.z3_expr = z3.Bool(name)
+    __slots__ = ('z3_expr',)
+
+    def __init__(self, name: str, index: Optional[int] = None):
+        super().__init__(name=name, index=index)
+        self.z3_expr = None  # created lazily
+
+    def create_z3(self) -> z3.BoolRef:
+        return z3.Bool(self.name)
 
 
 class And(expr.And, BooleanExpression):
@@ -70,9 +137,14 @@ class And(expr.And, BooleanExpression):
     arbitrary number of child expressions.
     """
 
+    __slots__ = ('z3_expr',)
+
     def __init__(self, bool_expressions: Sequence[expr.BooleanExpression]):
         super().__init__(bool_expressions)
-        self.z3_expr = z3.And([x.get_z3() for x in bool_expressions])
+        self.z3_expr = None  # created lazily
+
+    def create_z3(self) -> z3.BoolRef:
+        return z3.And([x.get_z3() for x in self.bool_expressions])
 
 
 class AtLeast(expr.Ge, BooleanExpression):
@@ -82,9 +154,15 @@ class AtLeast(expr.Ge, BooleanExpression):
     evaluates to true. Can have an arbitrary number of child expressions.
     """
 
+    __slots__ = ('z3_expr',)
+
     def __init__(self, bool_expressions: Sequence[expr.BooleanExpression], value: int):
         super().__init__(expr.Sum(bool_expressions), expr.NumericValue(value))
-        self.z3_expr = z3.AtLeast(*[e.get_z3() for e in bool_expressions], value)
+        self.z3_expr = None  # created lazily
+
+    def create_z3(self) -> z3.BoolRef:
+        return z3.AtLeast(*[e.get_z3() for e in self.arith_expression1.bool_expressions],
+                          self.arith_expression2.value)
 
 
 class AtMost(expr.Le, BooleanExpression):
@@ -94,9 +172,15 @@ class AtMost(expr.Le, BooleanExpression):
     evaluates to true. Can have an arbitrary number of child expressions.
     """
 
+    __slots__ = ('z3_expr',)
+
     def __init__(self, bool_expressions: Sequence[expr.BooleanExpression], value: int):
         super().__init__(expr.Sum(bool_expressions), expr.NumericValue(value))
-        self.z3_expr = z3.AtMost(*[e.get_z3() for e in bool_expressions], value)
+        self.z3_expr = None  # created lazily
+
+    def create_z3(self) -> z3.BoolRef:
+        return z3.AtMost(*[e.get_z3() for e in self.arith_expression1.bool_expressions],
+                         self.arith_expression2.value)
 
 
 class Iff(expr.Iff, BooleanExpression):
@@ -107,10 +191,15 @@ class Iff(expr.Iff, BooleanExpression):
     expressions.
     """
 
+    __slots__ = ('z3_expr',)
+
     def __init__(self, bool_expressions: Sequence[expr.BooleanExpression]):
         super().__init__(bool_expressions)
-        self.z3_expr = z3.Or(z3.And([x.get_z3() for x in bool_expressions]),
-                             z3.Not(z3.Or([x.get_z3() for x in bool_expressions])))
+        self.z3_expr = None  # created lazily
+
+    def create_z3(self) -> z3.BoolRef:
+        return z3.Or(z3.And([x.get_z3() for x in self.bool_expressions]),
+                     z3.Not(z3.Or([x.get_z3() for x in self.bool_expressions])))
 
 
 class Implies(expr.Implies, BooleanExpression):
@@ -120,10 +209,15 @@ class Implies(expr.Implies, BooleanExpression):
     child expression evaluates to true. Has exactly two child expressions.
     """
 
+    __slots__ = ('z3_expr',)
+
     def __init__(self, bool_expression1: expr.BooleanExpression,
                  bool_expression2: expr.BooleanExpression):
         super().__init__(bool_expression1, bool_expression2)
-        self.z3_expr = z3.Implies(bool_expression1.get_z3(), bool_expression2.get_z3())
+        self.z3_expr = None  # created lazily
+
+    def create_z3(self) -> z3.BoolRef:
+        return z3.Implies(self.bool_expression1.get_z3(), self.bool_expression2.get_z3())
 
 
 class Not(expr.Not, BooleanExpression):
@@ -133,9 +227,14 @@ class Not(expr.Not, BooleanExpression):
     expression.
     """
 
+    __slots__ = ('z3_expr',)
+
     def __init__(self, bool_expression: expr.BooleanExpression):
         super().__init__(bool_expression)
-        self.z3_expr = z3.Not(bool_expression.get_z3())
+        self.z3_expr = None  # created lazily
+
+    def create_z3(self) -> z3.BoolRef:
+        return z3.Not(self.bool_expression.get_z3())
 
 
 class Or(expr.Or, BooleanExpression):
@@ -145,9 +244,14 @@ class Or(expr.Or, BooleanExpression):
     have an arbitrary number of child expressions.
     """
 
+    __slots__ = ('z3_expr',)
+
     def __init__(self, bool_expressions: Sequence[expr.BooleanExpression]):
         super().__init__(bool_expressions)
-        self.z3_expr = z3.Or([x.get_z3() for x in bool_expressions])
+        self.z3_expr = None  # created lazily
+
+    def create_z3(self) -> z3.BoolRef:
+        return z3.Or([x.get_z3() for x in self.bool_expressions])
 
 
 class WeightedSumEq(expr.Eq, BooleanExpression):
@@ -160,11 +264,18 @@ class WeightedSumEq(expr.Eq, BooleanExpression):
     expressions.
     """
 
+    __slots__ = ('z3_expr',)
+
     def __init__(self, bool_expressions: Sequence[expr.BooleanExpression],
                  weights: Sequence[float], value: float):
         super().__init__(expr.WeightedSum(bool_expressions, weights), expr.NumericValue(value))
-        self.z3_expr = z3.PbEq([(e.get_z3(), w) for (e, w) in zip(bool_expressions, weights)],
-                               value)
+        self.z3_expr = None  # created lazily
+
+    def create_z3(self) -> z3.BoolRef:
+        weighted_sum = self.arith_expression1
+        return z3.PbEq([(e.get_z3(), w) for (e, w)
+                         in zip(weighted_sum.bool_expressions, weighted_sum.weights)],
+                        self.arith_expression2.value)
 
 
 class WeightedSumGe(expr.Ge, BooleanExpression):
@@ -177,11 +288,18 @@ class WeightedSumGe(expr.Ge, BooleanExpression):
     threshold value. Can have an arbitrary number of child expressions.
     """
 
+    __slots__ = ('z3_expr',)
+
     def __init__(self, bool_expressions: Sequence[expr.BooleanExpression],
                  weights: Sequence[float], value: float):
         super().__init__(expr.WeightedSum(bool_expressions, weights), expr.NumericValue(value))
-        self.z3_expr = z3.PbGe([(e.get_z3(), w) for (e, w) in zip(bool_expressions, weights)],
-                               value)
+        self.z3_expr = None  # created lazily
+
+    def create_z3(self) -> z3.BoolRef:
+        weighted_sum = self.arith_expression1
+        return z3.PbGe([(e.get_z3(), w) for (e, w)
+                         in zip(weighted_sum.bool_expressions, weighted_sum.weights)],
+                        self.arith_expression2.value)
 
 
 class WeightedSumLe(expr.Le, BooleanExpression):
@@ -194,11 +312,18 @@ class WeightedSumLe(expr.Le, BooleanExpression):
     threshold value. Can have an arbitrary number of child expressions.
     """
 
+    __slots__ = ('z3_expr',)
+
     def __init__(self, bool_expressions: Sequence[expr.BooleanExpression],
                  weights: Sequence[float], value: float):
         super().__init__(expr.WeightedSum(bool_expressions, weights), expr.NumericValue(value))
-        self.z3_expr = z3.PbLe([(e.get_z3(), w) for (e, w) in zip(bool_expressions, weights)],
-                               value)
+        self.z3_expr = None  # created lazily
+
+    def create_z3(self) -> z3.BoolRef:
+        weighted_sum = self.arith_expression1
+        return z3.PbLe([(e.get_z3(), w) for (e, w)
+                         in zip(weighted_sum.bool_expressions, weighted_sum.weights)],
+                        self.arith_expression2.value)
 
 
 class Xor(expr.Xor, BooleanExpression):
@@ -208,7 +333,160 @@ class Xor(expr.Xor, BooleanExpression):
     values. Has exactly two child expressions.
     """
 
+    __slots__ = ('z3_expr',)
+
     def __init__(self, bool_expression1: expr.BooleanExpression,
                  bool_expression2: expr.BooleanExpression):
         super().__init__(bool_expression1, bool_expression2)
-        self.z3_expr = z3.Xor(bool_expression1.get_z3(), bool_expression2.get_z3())
+        self.z3_expr = None  # created lazily
+
+    def create_z3(self) -> z3.BoolRef:
+        return z3.Xor(self.bool_expression1.get_z3(), self.bool_expression2.get_z3())
+
+
+# Expression types by name, for deserialization
+EXPRESSION_TYPES = {x.__name__: x for x in [
+    And, AtLeast, AtMost, BooleanValue, Iff, Implies, Not, Or, Variable, WeightedSumEq,
+    WeightedSumGe, WeightedSumLe, Xor]}
+
+
+def get_children(expression: BooleanExpression) -> Sequence[BooleanExpression]:
+    """Get child expressions
+
+    Parameters
+    ----------
+    expression : BooleanExpression
+        An expression from this module.
+
+    Raises
+    ------
+    ValueError
+        If the expression type is not from this module.
+
+    Returns
+    -------
+    Sequence[BooleanExpression]
+        The boolean child expressions (operands), empty for variables and values.
+    """
+
+    if isinstance(expression, (BooleanValue, Variable)):  # "Variable" is subclass of value
+        return []
+    if isinstance(expression, (And, Iff, Or)):
+        return expression.bool_expressions
+    if isinstance(expression, (Implies, Xor)):
+        return [expression.bool_expression1, expression.bool_expression2]
+    if isinstance(expression, Not):
+        return [expression.bool_expression]
+    if isinstance(expression, (AtLeast, AtMost, WeightedSumEq, WeightedSumGe, WeightedSumLe)):
+        return expression.arith_expression1.bool_expressions
+    raise ValueError(f'Unknown expression type "{type(expression).__name__}".')
+
+
+def serialize(expressions: Sequence[BooleanExpression]) -> Dict[str, List[Any]]:
+    """Serialize expressions
+
+    Converts expressions into a compact representation consisting of lists, strings, and numbers
+    only, which can be stored as JSON or pickled cheaply (in contrast to Z3 expressions). Each
+    node of the expression trees becomes a list with the type name, the indices of the child
+    nodes (in the list of all nodes), and the remaining arguments of the initializer. Child nodes
+    precede their parents, and nodes shared between multiple expressions are only stored once.
+
+    Parameters
+    ----------
+    expressions : Sequence[BooleanExpression]
+        Expressions from this module, e.g., the constraints of an optimization problem.
+
+    Raises
+    ------
+    ValueError
+        If an expression type is not from this module.
+
+    Returns
+    -------
+    Dict[str, List[Any]]
+        The nodes ("nodes") and the indices of the nodes representing the expressions ("roots").
+    """
+
+    nodes = []
+    node_indices = {}  # map ids of expressions to their positions in "nodes"
+    for root in expressions:
+        stack = [root]  # iterative post-order traversal, as trees may be deep
+        while len(stack) > 0:
+            expression = stack[-1]
+            if id(expression) in node_indices:
+                stack.pop()
+                continue
+            missing_children = [x for x in get_children(expression) if id(x) not in node_indices]
+            if len(missing_children) > 0:
+                stack.extend(missing_children)
+                continue
+            stack.pop()
+            children = [node_indices[id(x)] for x in get_children(expression)]
+            if isinstance(expression, Variable):
+                node = [expression.name, expression.index]
+            elif isinstance(expression, BooleanValue):
+                node = [expression.value]
+            elif isinstance(expression, (And, Iff, Or)):
+                node = [children]
+            elif isinstance(expression, (Implies, Not, Xor)):
+                node = children
+            elif isinstance(expression, (AtLeast, AtMost)):
+                node = [children, expression.arith_expression2.value]
+            else:  # weighted sums
+                node = [children, list(expression.arith_expression1.weights),
+                        expression.arith_expression2.value]
+            node_indices[id(expression)] = len(nodes)
+            nodes.append([type(expression).__name__] + node)
+    return {'nodes': nodes, 'roots': [node_indices[id(x)] for x in expressions]}
+
+
+def deserialize(data: Dict[str, List[Any]],
+                variables: Optional[Sequence[Variable]] = None) -> List[BooleanExpression]:
+    """Deserialize expressions
+
+    Inverse of :func:`serialize`.
+
+    Parameters
+    ----------
+    data : Dict[str, List[Any]]
+        Serialized expressions, as returned by :func:`serialize`.
+    variables : Optional[Sequence[Variable]], optional
+        If provided, serialized variables with an index refer to the variable with this index in
+        the sequence (e.g., the variables of an optimization problem) instead of creating a new
+        variable.
+
+    Raises
+    ------
+    ValueError
+        If a node has an unknown type.
+
+    Returns
+    -------
+    List[BooleanExpression]
+        The expressions (with the same structure, including shared nodes).
+    """
+
+    expressions = []
+    for type_name, *args in data['nodes']:
+        if type_name not in EXPRESSION_TYPES:
+            raise ValueError(f'Unknown expression type "{type_name}".')
+        expression_type = EXPRESSION_TYPES[type_name]
+        if expression_type is Variable:
+            name, index = args
+            if variables is not None and index is not None:
+                expression = variables[index]
+            else:
+                expression = Variable(name=name, index=index)
+        elif expression_type is BooleanValue:
+            expression = BooleanValue(value=args[0])
+        elif expression_type in (And, Iff, Or):
+            expression = expression_type([expressions[i] for i in args[0]])
+        elif expression_type in (Implies, Not, Xor):
+            expression = expression_type(*[expressions[i] for i in args])
+        elif expression_type in (AtLeast, AtMost):
+            expression = expression_type([expressions[i] for i in args[0]], value=args[1])
+        else:  # weighted sums
+            expression = expression_type([expressions[i] for i in args[0]], weights=args[1],
+                                         value=args[2])
+        expressions.append(expression)
+    return [expressions[i] for i in data['roots']]
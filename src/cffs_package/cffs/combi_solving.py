@@ -7,17 +7,51 @@ Literature
 ----------
 - Bach et al. (2022): "An Empirical Evaluation of Constrained Feature Selection"
 - Barrett & Tinelli (2018): "Satisfiability Modulo Theories"
+- Chakraborty et al. (2013): "A Scalable Approximate Model Counter"
+- Chakraborty et al. (2016): "Algorithmic Improvements in Approximate Counting for Probabilistic
+  Inference: From Linear to Logarithmic SAT Calls"
 - de Moura & Bjorner (2008): "Z3: An Efficient SMT Solver"
 """
 
-from typing import Dict, Union, Sequence
+import fractions
+import json
+import math
+import multiprocessing
+import random
+import statistics
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
 import z3
 
+from . import branch_and_bound
 from . import combi_expressions as expr
+from . import counting
+from . import milp
+from . import preprocessing
 from . import solving
 
 
+Z3_NO_TIMEOUT = 2 ** 32 - 1  # default value of Z3's "timeout" parameter, i.e., no time limit
+MIN_FALLBACK_TIME = 0.1  # seconds remaining after an aborted solver backend to also try Z3
+# Metrics recorded from Z3's statistics after optimization (values summed over keys, as different
+# solver cores of Z3 report under different names)
+Z3_STATISTICS = {
+    'z3_conflicts': ['sat conflicts', 'conflicts'],
+    'z3_decisions': ['sat decisions', 'decisions'],
+    'z3_propagations': ['sat propagations 2ary', 'sat propagations nary', 'propagations'],
+}
+
+# Configurations for Problem(portfolio=...): cardinality/pseudo-boolean handling by the SAT solver
+# (native or via encoding into clauses), MaxSAT engines, and random seeds
+DEFAULT_PORTFOLIO = [
+    {'sat.cardinality.solver': False},  # setting of the class (see below)
+    {'sat.cardinality.solver': True},
+    {'sat.cardinality.solver': False, 'opt.maxsat_engine': 'wmax'},
+    {'sat.cardinality.solver': False, 'smt.random_seed': 1, 'sat.random_seed': 1},
+]
+
+
 class Problem(solving.Problem):
     """SMT optimization problem
 
@@ -28,7 +62,10 @@ class Problem(solving.Problem):
     # Following setting counterintuitively improves evaluation speed of cardinality constraints
     z3.set_param('sat.cardinality.solver', False)
 
-    def __init__(self, variable_names: Sequence[str], qualities: Sequence[float]):
+    def __init__(self, variable_names: Sequence[str], qualities: Sequence[float],
+                 incremental_counting: bool = False, use_assumptions: bool = False,
+                 solver: str = 'z3', quality_precision: Optional[int] = None,
+                 portfolio: Optional[Sequence[Dict[str, Any]]] = None, preprocess: bool = False):
         """Initialize problem
 
         Creates an unconstrained SMT problem and internally stores one binary decision variable for
@@ -42,24 +79,167 @@ class Problem(solving.Problem):
             Desired names of the decision variables (which represent feature-selection decisions).
         qualities : Sequence[float]
             Univariate feature qualities; see :mod:`feature_qualities`.
+        incremental_counting : bool, optional
+            If True, maintain the set of solutions while adding constraints; see
+            :class:`solving.Problem`.
+        use_assumptions : bool, optional
+            If True, guard each constraint with a fresh indicator variable (constraint holds if
+            indicator is true) and activate the current constraints via assumptions in
+            :meth:`optimize` instead of pushing and popping solver states. The solver then keeps
+            learned clauses (and bounds on the objective) when constraints are cleared, which can
+            speed up solving sequences of related problems. Cleared constraints remain in the
+            solver, but their indicators are permanently set to false.
+        solver : str, optional
+            Solver backend for :meth:`optimize`. "z3" always uses Z3. "bnb" uses a dedicated
+            branch-and-bound optimizer (see :class:`branch_and_bound.BranchAndBound`) if all
+            constraints are linear (see :func:`expressions.get_linear_constraints`), e.g.,
+            cardinality constraints, and falls back to Z3 otherwise (or if the search exceeds
+            :data:`branch_and_bound.MAX_NODES` nodes). "milp" linearizes all constraints (see
+            :class:`milp.LinearModel`) and uses the MILP solver HiGHS (requires scipy >= 1.9, see
+            :func:`milp.is_solver_available`), falling back to Z3 for expression types that cannot
+            be linearized.
+        quality_precision : Optional[int], optional
+            If provided, round the qualities to this number of decimal digits and formulate the
+            objective for Z3 as a sum of integers (the qualities scaled by 10^precision) instead
+            of rational numbers, so Z3 uses integer arithmetic (which may be faster, depending on
+            the constraints). :meth:`optimize` unscales the objective value, so results are as if
+            the rounded qualities were passed directly.
+        portfolio : Optional[Sequence[Dict[str, Any]]], optional
+            If provided, :meth:`optimize` races Z3 with each of these configurations (Z3
+            parameter names and values, e.g., :data:`DEFAULT_PORTFOLIO`) in a separate process
+            instead of running Z3 in the current process; see :meth:`optimize_portfolio`.
+        preprocess : bool, optional
+            If True, :meth:`optimize` and :meth:`compute_solution_fraction` simplify the
+            constraints, propagate variables whose values are forced, and fix variables that
+            cannot affect the optimum (see :func:`preprocessing.preprocess`) before optimizing
+            (see :meth:`optimize_preprocessed`) or counting. As the reduced problem is created
+            for each call, the solver state is not kept between optimizations.
         """
 
         assert len(variable_names) == len(qualities)
+        if solver not in ('z3', 'bnb', 'milp'):
+            raise ValueError(f'Unknown solver "{solver}".')
+        if (solver == 'milp') and not milp.is_solver_available():
+            raise ValueError('Solver "milp" requires scipy >= 1.9 (optional dependency "milp").')
         # Improve optimizer performance by sorting qualities decreasingly; adapt order of variable
         # names accordingly:
         qualities, variable_names = zip(*sorted(zip(qualities, variable_names),
                                                 key=lambda x: -x[0]))
+        super().__init__(variable_names=variable_names, incremental_counting=incremental_counting)
+        self.quality_scale = 1  # factor between Z3 objective value and actual objective value
+        if quality_precision is not None:
+            qualities = tuple(round(q, quality_precision) for q in qualities)
+            self.quality_scale = 10 ** quality_precision
         self.qualities = qualities
-        self.variables = [expr.Variable(name=x) for x in variable_names]
-        self.constraints = []
+        # Replace variables of superclass with variables that also have a Z3 representation:
+        self.variables = [expr.Variable(name=x, index=i) for i, x in enumerate(variable_names)]
         self.optimizer = z3.Optimize()
         # Direct multiplication between bool var and real quality returns wrong type (BoolRef) if
         # quality is 1, so we use "If" instead (multiplication is transformed to such an expression
         # anyway):
-        objective = z3.Sum([z3.If(var.get_z3(), q, 0)
-                            for (q, var) in zip(qualities, self.get_variables())])
-        self.objective = self.optimizer.maximize(objective)
+        if quality_precision is None:
+            z3_qualities = qualities
+        else:  # exact decimal value (like Z3 parses floats) scaled to an integer
+            z3_qualities = [int(fractions.Fraction(str(q)) * self.quality_scale)
+                            for q in qualities]
+        self.z3_objective = z3.Sum([z3.If(var.get_z3(), q, 0)
+                                    for (q, var) in zip(z3_qualities, self.get_variables())])
+        self.objective = self.optimizer.maximize(self.z3_objective)
         self.optimizer.push()  # restore point for state without constraints
+        self.use_assumptions = use_assumptions
+        self.solver = solver
+        self.active_indicators = []  # indicator variables of current constraints (for assumptions)
+        self.num_asserted_constraints = 0  # constraints already passed to Z3 (added lazily)
+        self.portfolio = portfolio
+        self.quality_precision = quality_precision
+        self.preprocess = preprocess
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Problem':
+        """Create problem from serialized representation
+
+        Inverse of :meth:`to_dict`.
+
+        Parameters
+        ----------
+        data : Dict[str, Any]
+            Serialized problem, as returned by :meth:`to_dict`.
+
+        Returns
+        -------
+        Problem
+            A problem with the same variables, qualities, settings, and constraints.
+        """
+
+        problem = cls(variable_names=data['variable_names'], qualities=data['qualities'],
+                      incremental_counting=data['incremental_counting'],
+                      use_assumptions=data['use_assumptions'], solver=data['solver'],
+                      quality_precision=data['quality_precision'], portfolio=data['portfolio'],
+                      preprocess=data['preprocess'])
+        for constraint in expr.deserialize(data['constraints'], variables=problem.get_variables()):
+            problem.add_constraint(constraint)
+        return problem
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize problem
+
+        Creates a compact representation of the problem's variables, qualities, settings (from
+        :meth:`__init__`), and constraints (see :func:`combi_expressions.serialize`), consisting of
+        dicts, lists, strings, and numbers only. Thus, in contrast to the problem itself (which
+        holds Z3 objects), the result can be pickled cheaply (e.g., to ship a problem to another
+        process) or stored as JSON (e.g., to cache problems). Runtime state, like metrics or the
+        state of the solver, is not included.
+
+        Returns
+        -------
+        Dict[str, Any]
+            The serialized problem, which :meth:`from_dict` turns into a problem again.
+        """
+
+        return {
+            'variable_names': [x.get_name() for x in self.variables],
+            'qualities': [q.item() if hasattr(q, 'item') else q  # numpy to Python numbers
+                          for q in self.qualities],
+            'incremental_counting': self.solution_bitmap is not None,
+            'use_assumptions': self.use_assumptions,
+            'solver': self.solver,
+            'quality_precision': self.quality_precision,
+            'portfolio': None if self.portfolio is None else [dict(x) for x in self.portfolio],
+            'preprocess': self.preprocess,
+            'constraints': expr.serialize(self.constraints)
+        }
+
+    def to_smtlib(self) -> str:
+        """Export problem in SMT-LIB format
+
+        Creates declarations of the decision variables, assertions of the current constraints, and
+        the objective (as "maximize" command), which Z3 and other SMT solvers supporting
+        optimization can read (e.g., via :meth:`z3.Optimize.from_string`).
+
+        Returns
+        -------
+        str
+            The problem in SMT-LIB 2 format.
+        """
+
+        optimizer = z3.Optimize()  # only current constraints, no indicators or pushed states
+        optimizer.add([x.get_z3() for x in self.constraints])
+        optimizer.maximize(self.z3_objective)
+        return optimizer.sexpr()
+
+    def __reduce__(self) -> Tuple[Any, Tuple[Dict[str, Any]]]:
+        """Support pickling
+
+        Z3 objects cannot be pickled, so the problem is pickled in its serialized form (see
+        :meth:`to_dict`) and rebuilt (see :meth:`from_dict`) when unpickled.
+
+        Returns
+        -------
+        Tuple[Any, Tuple[Dict[str, Any]]]
+            Function and arguments to re-create the problem.
+        """
+
+        return type(self).from_dict, (self.to_dict(),)
 
     def get_qualities(self) -> Sequence[float]:
         """Get feature qualities
@@ -73,31 +253,294 @@ class Problem(solving.Problem):
 
         return self.qualities
 
-    def add_constraint(self, constraint: expr.BooleanExpression) -> None:
-        super().add_constraint(constraint)
-        self.optimizer.add(constraint.get_z3())  # AttributeError if "z3_expr" not in "constraint"
+    def get_metrics(self) -> Dict[str, float]:
+        """Get performance metrics
+
+        Besides the metrics of :meth:`solving.Problem.get_metrics`, returns the runtime (in
+        seconds) of creating and asserting constraints for Z3 ("z3_build_time"), of
+        :meth:`optimize` ("solve_time"), of :meth:`approximate_solution_fraction` (as part of
+        "counting_time"), and of preprocessing ("preprocessing_time", plus the number of variables
+        fixed in the last optimization, "num_fixed_variables"), as well as statistics of Z3's
+        optimization runs in this process (see :data:`Z3_STATISTICS`, plus peak memory usage
+        "z3_max_memory_mb").
+
+        Returns
+        -------
+        Dict[str, float]
+            Metric names and values; suitable to be added to a dict of results.
+        """
+
+        return super().get_metrics()
+
+    def add_z3_statistics(self) -> None:
+        """Record statistics of Z3
+
+        Sub-routine of :meth:`optimize`, to be called after a check of the optimizer. Adds the
+        counters of :data:`Z3_STATISTICS` to the metrics and updates the peak memory usage.
+        """
+
+        statistics = self.optimizer.statistics()
+        values = {key: statistics.get_key_value(key) for key in statistics.keys()}
+        for metric_name, keys in Z3_STATISTICS.items():
+            self.add_metric(metric_name, sum(values.get(key, 0) for key in keys))
+        self.metrics['z3_max_memory_mb'] = max(self.metrics.get('z3_max_memory_mb', 0),
+                                               values.get('max memory', 0))
+
+    def assert_constraints(self) -> None:
+        """Pass constraints to Z3
+
+        Adds the constraints that were added to the problem since the last call of this method to
+        the Z3 optimizer, creating their Z3 expressions (see
+        :meth:`combi_expressions.BooleanExpression.get_z3`). Called by the methods that run Z3, so
+        problems that are only counted (or optimized with another solver backend) do not create
+        Z3 expressions for their constraints.
+        """
+
+        start_time = time.perf_counter()
+        for constraint in self.constraints[self.num_asserted_constraints:]:
+            if self.use_assumptions:
+                indicator = z3.FreshBool('constraint')  # name cannot clash with (feature) vars
+                self.active_indicators.append(indicator)
+                self.optimizer.add(z3.Implies(indicator, constraint.get_z3()))
+            else:
+                self.optimizer.add(constraint.get_z3())  # AttributeError if no "get_z3()"
+        self.num_asserted_constraints = len(self.constraints)
+        self.add_metric('z3_build_time', time.perf_counter() - start_time)
 
     def clear_constraints(self) -> None:
         super().clear_constraints()
-        self.optimizer.pop()  # go to restore point (state with no constraints)
-        self.optimizer.push()  # create new restore point (again, with no constraints)
+        self.num_asserted_constraints = 0
+        if self.use_assumptions:
+            # Retire indicators, so the solver may simplify the corresponding constraints away:
+            self.optimizer.add([z3.Not(x) for x in self.active_indicators])
+            self.active_indicators = []
+        else:
+            self.optimizer.pop()  # go to restore point (state with no constraints)
+            self.optimizer.push()  # create new restore point (again, with no constraints)
 
-    def optimize(self) -> Dict[str, Union[float, Sequence[str]]]:
+    def optimize(self, timeout: Optional[float] = None,
+                 rlimit: Optional[int] = None) -> Dict[str, Union[float, bool, Sequence[str]]]:
         """Optimize problem
 
-        Run Z3 on the SMT optimization problem and return optimization results.
+        Run Z3 (or another solver backend, if applicable; see :meth:`__init__`) on the SMT
+        optimization problem (preprocessed, if applicable) and return optimization results.
+
+        If a budget (`timeout` and/or `rlimit`) is provided, the solvers stop once the budget is
+        exhausted and the best solution found so far (incumbent) is returned. If another solver
+        backend aborts early (e.g., due to the node limit of branch and bound), Z3 continues with
+        the remaining budget, and the better of both incumbents is returned. In this case, the
+        results additionally contain an upper bound on the optimal objective value (from a
+        relaxation of the linear constraints; see :meth:`compute_upper_bound`), the (absolute)
+        optimality gap between this bound and the objective value, and whether the solution is
+        proven to be optimal.
+
+        Parameters
+        ----------
+        timeout : Optional[float], optional
+            Maximum runtime in seconds (applies to all solver backends combined). If None, no
+            time limit.
+        rlimit : Optional[int], optional
+            Maximum number of resource units Z3 may consume (a deterministic, machine-independent
+            budget, roughly proportional to the solver's work). If None, no resource limit.
+
+        Returns
+        -------
+        Dict[str, Union[float, bool, Sequence[str]]]
+            Optimization results: objective value and selected features; if a budget is
+            provided, also "upper_bound", "gap", and "proven_optimal". If no solution was found
+            within the budget, no features are selected.
+        """
+
+        start_time = time.perf_counter()
+        result = None
+        if self.preprocess:
+            result = self.optimize_preprocessed(timeout=timeout, rlimit=rlimit)
+        elif self.solver == 'bnb':
+            result = self.optimize_branch_and_bound(time_limit=timeout)
+        elif self.solver == 'milp':
+            result = self.optimize_milp(time_limit=timeout)
+        backend_result = None  # incumbent of an aborted solver backend (other than Z3)
+        if (not self.preprocess) and (result is not None) and\
+                (not result.get('proven_optimal', True)) and\
+                ((timeout is None) or
+                 (timeout - (time.perf_counter() - start_time) >= MIN_FALLBACK_TIME)):
+            backend_result, result = result, None  # e.g., node limit of "bnb" hit, so try Z3
+        if result is None and self.portfolio is not None:
+            result = self.optimize_portfolio(
+                timeout=None if timeout is None else timeout - (time.perf_counter() - start_time),
+                rlimit=rlimit)
+        if result is None:
+            self.assert_constraints()
+            if timeout is not None:  # remaining time (Z3 expects milliseconds, 0 means no limit)
+                self.optimizer.set(timeout=max(
+                    round((timeout - (time.perf_counter() - start_time)) * 1000), 1))
+            if rlimit is not None:
+                self.optimizer.set(rlimit=rlimit)
+            try:  # no assumption literals passed if "use_assumptions" is False:
+                check_result = self.optimizer.check(*self.active_indicators)
+            finally:  # restore defaults, i.e., no limits
+                if timeout is not None:
+                    self.optimizer.set(timeout=Z3_NO_TIMEOUT)
+                if rlimit is not None:
+                    self.optimizer.set(rlimit=0)
+            self.add_z3_statistics()
+            if check_result == z3.unsat:  # newer Z3 versions do not provide a model in this case
+                result = {'objective_value': 0, 'num_selected': 0, 'selected': []}
+            elif check_result == z3.sat:
+                result = self.get_z3_result()
+            else:  # budget exhausted (or solver gave up otherwise)
+                try:
+                    model = self.optimizer.model()
+                    selected = [i for i, var in enumerate(self.get_variables())
+                                if z3.is_true(model.eval(var.get_z3(), model_completion=True))]
+                except z3.Z3Exception:  # no solution found yet
+                    selected = None
+                result = self.get_incumbent_result(selected=selected)
+        if (backend_result is not None) and (not result.get('proven_optimal', True)) and\
+                (backend_result['objective_value'] > result['objective_value']):
+            result = backend_result
+        # Bound information of incumbent results already set, else solution is proven optimal:
+        if (timeout is not None or rlimit is not None) and 'proven_optimal' not in result:
+            result['upper_bound'] = result['objective_value']
+            result['gap'] = 0
+            result['proven_optimal'] = True
+        self.add_metric('solve_time', time.perf_counter() - start_time)
+        return result
+
+    def get_incumbent_result(
+            self, selected: Optional[Sequence[int]]
+    ) -> Dict[str, Union[float, bool, Sequence[str]]]:
+        """Get optimization results of an aborted optimization
+
+        Sub-routine of :meth:`optimize`, to be called after a solver exhausted its budget.
+
+        Parameters
+        ----------
+        selected : Optional[Sequence[int]]
+            Indices of the selected variables in the best solution found so far, or None if no
+            solution was found.
+
+        Returns
+        -------
+        Dict[str, Union[float, bool, Sequence[str]]]
+            Optimization results (see :meth:`optimize`) for the best solution found so far, or
+            with no selected features if there is none, plus bound information.
+        """
+
+        found_solution = selected is not None
+        if not found_solution:
+            selected = []
+        # Bounds of Z3's objective handle are not reliable after aborting, so use a relaxation:
+        upper_bound = self.compute_upper_bound()
+        if upper_bound == -math.inf:  # relaxation is infeasible, so problem is infeasible
+            return {'objective_value': 0, 'num_selected': 0, 'selected': [], 'upper_bound': 0,
+                    'gap': 0, 'proven_optimal': True}
+        result = {'objective_value': branch_and_bound.compute_objective_value(
+                      qualities=self.qualities, selected=selected),
+                  'num_selected': len(selected),
+                  'selected': [self.variables[i].get_name() for i in selected]}
+        result['upper_bound'] = max(upper_bound, result['objective_value'])  # float rounding
+        result['gap'] = result['upper_bound'] - result['objective_value']
+        result['proven_optimal'] = found_solution and result['gap'] == 0
+        return result
+
+    def optimize_portfolio(
+            self, timeout: Optional[float] = None, rlimit: Optional[int] = None
+    ) -> Dict[str, Union[float, bool, Sequence[str]]]:
+        """Optimize problem with a portfolio of Z3 configurations
+
+        Sub-routine of :meth:`optimize` (if a portfolio was provided during initialization).
+        Exports the current constraints and the objective in SMT-LIB format and solves this
+        problem with each configuration in a separate process (see :func:`optimize_smtlib`). As
+        soon as one configuration proves optimality (or infeasibility), returns its result and
+        terminates the other processes. Thus, the runtime is roughly that of the fastest
+        configuration, provided that there are enough cores for all processes.
+
+        Parameters
+        ----------
+        timeout : Optional[float], optional
+            Maximum runtime in seconds for each configuration. If None, no time limit.
+        rlimit : Optional[int], optional
+            Maximum number of Z3 resource units for each configuration. If None, no limit.
+
+        Returns
+        -------
+        Dict[str, Union[float, bool, Sequence[str]]]
+            Optimization results (see :meth:`optimize`). If no configuration finished within the
+            budget, the best solution found by any configuration plus bound information.
+        """
+
+        smtlib = self.to_smtlib()
+        timeout_ms = None if timeout is None else max(round(timeout * 1000), 1)
+        tasks = [(smtlib, config, timeout_ms, rlimit,
+                  [x.get_name() for x in self.variables]) for config in self.portfolio]
+        result_queue = multiprocessing.SimpleQueue()
+        processes = [multiprocessing.Process(target=run_portfolio_member, args=(task, result_queue),
+                                             daemon=True) for task in tasks]
+        incumbents = []
+        try:
+            for process in processes:
+                process.start()
+            for _ in range(len(processes)):
+                status, selected = result_queue.get()
+                if status == 'error':
+                    raise RuntimeError(f'Portfolio configuration failed: {selected}')
+                if status == 'unsat':  # like in optimize()
+                    return {'objective_value': 0, 'num_selected': 0, 'selected': []}
+                if status == 'sat':
+                    return self.create_result(selected=selected, status='optimal')
+                if selected is not None:
+                    incumbents.append(selected)
+        finally:  # stop configurations that are still running
+            for process in processes:
+                if process.is_alive():
+                    process.kill()
+                process.join()
+        if len(incumbents) == 0:
+            return self.get_incumbent_result(selected=None)
+        return self.get_incumbent_result(selected=max(
+            incumbents, key=lambda x: branch_and_bound.compute_objective_value(
+                qualities=self.qualities, selected=x)))
+
+    def compute_upper_bound(self) -> float:
+        """Compute upper bound on the optimal objective value
+
+        Relaxes the problem by dropping all constraints that cannot be represented linearly (see
+        :meth:`solving.Problem.get_linear_constraints`) and computes the bound of
+        :meth:`branch_and_bound.BranchAndBound.compute_upper_bound` for the remaining ones, i.e.,
+        fractional-knapsack relaxations after propagation. Cheap compared to optimization.
+
+        Returns
+        -------
+        float
+            An upper bound on the objective value of all solutions, or -inf if the constraints
+            cannot be satisfied.
+        """
+
+        return branch_and_bound.BranchAndBound(
+            qualities=self.qualities, linear_constraints=self.get_linear_constraints(relax=True)
+        ).compute_upper_bound()
+
+    def get_z3_result(self) -> Dict[str, Union[float, Sequence[str]]]:
+        """Get optimization results from Z3
+
+        Sub-routine of :meth:`optimize` and :meth:`optimize_top_k`, to be called after a check of
+        the optimizer.
 
         Returns
         -------
         Dict[str, Union[float, Sequence[str]]]
-            Optimization results: objective value and selected features.
+            Optimization results (see :meth:`optimize`).
         """
 
-        self.optimizer.check()
         # Object value can have different types, depending on whether result is a whole number;
         # if no valid variable assignment (result of "check()" is "unsat"), objective value is 0
         if self.objective.value().is_int():  # type IntNumRef
             value = self.objective.value().as_long()
+            if self.quality_scale != 1:  # undo scaling of integer objective
+                value = fractions.Fraction(value, self.quality_scale)
+                value = (value.numerator if value.denominator == 1 else
+                         value.numerator / value.denominator)
         else:  # type RatNumRef
             value = (self.objective.value().numerator_as_long() /
                      self.objective.value().denominator_as_long())
@@ -107,3 +550,564 @@ class Problem(solving.Problem):
         selected = [var.get_name() for var in self.get_variables()
                     if str(model[var.get_z3()]) == 'True']
         return {'objective_value': value, 'num_selected': len(selected), 'selected': selected}
+
+    def optimize_top_k(
+            self, k: Optional[int] = None) -> Iterator[Dict[str, Union[float, Sequence[str]]]]:
+        """Enumerate best solutions
+
+        Generator yielding the `k` best distinct solutions (feature sets) in descending order of
+        their objective value, i.e., the first result equals the one of :meth:`optimize`. After
+        each solution, adds a blocking clause excluding exactly this feature set to the current
+        solver state and re-optimizes, so the solver keeps its learned clauses between solutions.
+        Solutions are computed lazily, so stopping the iteration early saves the remaining solver
+        calls. The blocking clauses are removed when the generator finishes or is closed. Always
+        uses Z3, independent from the solver backend (see :meth:`__init__`). The problem should
+        not be changed while iterating.
+
+        Parameters
+        ----------
+        k : Optional[int], optional
+            Maximum number of solutions. If None, enumerate all solutions. Fewer solutions are
+            yielded if the constraints do not permit more.
+
+        Yields
+        ------
+        Dict[str, Union[float, Sequence[str]]]
+            Optimization results (see :meth:`optimize`) for one solution.
+        """
+
+        self.assert_constraints()
+        self.optimizer.push()  # restore point for state without blocking clauses
+        try:
+            num_solutions = 0
+            while ((k is None or num_solutions < k) and
+                   self.optimizer.check(*self.active_indicators) == z3.sat):
+                result = self.get_z3_result()
+                num_solutions += 1
+                yield result
+                selected = set(result['selected'])
+                self.optimizer.add(z3.Or([z3.Not(x.get_z3()) if x.get_name() in selected
+                                          else x.get_z3() for x in self.get_variables()]))
+        finally:
+            self.optimizer.pop()
+
+    def optimize_cardinality_front(
+            self, cardinalities: Iterable[int], counting_method: Optional[str] = None,
+            timeout: Optional[float] = None, rlimit: Optional[int] = None
+    ) -> List[Dict[str, Union[float, bool, Sequence[str]]]]:
+        """Optimize problem for multiple global cardinalities
+
+        Computes the trade-off between objective value and number of selected features: For each
+        cardinality k, optimizes the problem (see :meth:`optimize`) under the current constraints
+        plus a global cardinality constraint that at most k variables are selected. Cardinalities
+        are processed in descending order. For each of them, the constraints are cleared (see
+        :meth:`clear_constraints`) and added again, together with the new cardinality constraint,
+        to the same solver (which keeps its state; see :meth:`__init__`), so with
+        `use_assumptions`, the retired constraints of previous steps remain in the solver. If the
+        solution for the previous (larger) cardinality also satisfies the current bound, it
+        remains optimal and is re-used without solving (as is infeasibility, unless the previous
+        optimization exhausted its budget). Afterwards, the problem has its original constraints
+        again, but metrics (see :meth:`get_metrics`) are reset.
+
+        Parameters
+        ----------
+        cardinalities : Iterable[int]
+            Upper bounds on the number of selected variables.
+        counting_method : Optional[str], optional
+            If provided, also compute the fraction of solutions (see
+            :meth:`compute_solution_fraction`) for each cardinality with this method.
+        timeout : Optional[float], optional
+            Maximum runtime in seconds for each optimization; see :meth:`optimize`.
+        rlimit : Optional[int], optional
+            Maximum number of Z3 resource units for each optimization; see :meth:`optimize`.
+
+        Returns
+        -------
+        List[Dict[str, Union[float, bool, Sequence[str]]]]
+            For each cardinality (in the provided order), optimization results (see
+            :meth:`optimize`) plus the fraction of solutions ("frac_solutions") if requested,
+            and the metrics (see :meth:`get_metrics`) of this cardinality.
+        """
+
+        cardinalities = list(cardinalities)
+        constraints = list(self.constraints)
+        results = {}  # map cardinalities to results
+        result = None
+        try:
+            for cardinality in sorted(set(cardinalities), reverse=True):
+                self.clear_constraints()
+                for constraint in constraints + [expr.AtMost(self.variables, cardinality)]:
+                    self.add_constraint(constraint)
+                if (result is None) or (result['num_selected'] > cardinality) or\
+                        not result.get('proven_optimal', True):
+                    result = self.optimize(timeout=timeout, rlimit=rlimit)
+                results[cardinality] = dict(result)
+                if counting_method is not None:
+                    results[cardinality]['frac_solutions'] = self.compute_solution_fraction(
+                        method=counting_method)
+                results[cardinality].update(self.get_metrics())
+        finally:  # restore constraints
+            self.clear_constraints()
+            for constraint in constraints:
+                self.add_constraint(constraint)
+        return [dict(results[x], selected=list(results[x]['selected'])) for x in cardinalities]
+
+    def optimize_batch(
+            self, constraint_sets: Iterable[Sequence[expr.BooleanExpression]],
+            counting_method: Optional[str] = None, timeout: Optional[float] = None,
+            rlimit: Optional[int] = None) -> Iterator[Dict[str, Union[float, bool, Sequence[str]]]]:
+        """Optimize problem under multiple sets of constraints
+
+        Generator which, for each set of constraints, replaces the constraints of the problem with
+        this set, optimizes (see :meth:`optimize`), and yields the results. All sets share the
+        variables, the objective, and the solver of this problem (which keeps its state between
+        optimizations; see :meth:`__init__`), so the setup cost is only paid once. Sets that
+        are structurally identical to a previous set (same serialization; see
+        :func:`combi_expressions.serialize`) are not solved again, but get a copy of the previous
+        results. Sets are consumed lazily, so they may be generated on the fly. During iteration,
+        :meth:`get_metrics` refers to the set solved last. The constraints are cleared when the
+        generator finishes or is closed.
+
+        Parameters
+        ----------
+        constraint_sets : Iterable[Sequence[expr.BooleanExpression]]
+            Sets of constraints (each combined by AND) over the variables of this problem.
+        counting_method : Optional[str], optional
+            If provided, also compute the fraction of solutions (see
+            :meth:`compute_solution_fraction`) with this method.
+        timeout : Optional[float], optional
+            Maximum runtime in seconds for each optimization; see :meth:`optimize`.
+        rlimit : Optional[int], optional
+            Maximum number of Z3 resource units for each optimization; see :meth:`optimize`.
+
+        Yields
+        ------
+        Dict[str, Union[float, bool, Sequence[str]]]
+            Optimization results (see :meth:`optimize`) for one set of constraints, plus the
+            fraction of solutions ("frac_solutions") if requested.
+        """
+
+        results = {}  # map serialized constraint sets to results
+        try:
+            for constraints in constraint_sets:
+                key = json.dumps(expr.serialize(constraints))
+                if key not in results:
+                    self.clear_constraints()
+                    for constraint in constraints:
+                        self.add_constraint(constraint)
+                    result = self.optimize(timeout=timeout, rlimit=rlimit)
+                    if counting_method is not None:
+                        result['frac_solutions'] = self.compute_solution_fraction(
+                            method=counting_method)
+                    results[key] = result
+                result = dict(results[key])
+                result['selected'] = list(result['selected'])  # callers may modify results
+                yield result
+        finally:
+            self.clear_constraints()
+
+    def optimize_branch_and_bound(
+            self, time_limit: Optional[float] = None
+    ) -> Optional[Dict[str, Union[float, bool, Sequence[str]]]]:
+        """Optimize problem with branch and bound
+
+        Sub-routine of :meth:`optimize` (with solver "bnb").
+
+        Parameters
+        ----------
+        time_limit : Optional[float], optional
+            Maximum runtime of the search in seconds. If None, no time limit (but a node limit).
+
+        Returns
+        -------
+        Optional[Dict[str, Union[float, bool, Sequence[str]]]]
+            Optimization results (see :meth:`optimize`), or None if some constraint is not linear.
+            If the search was aborted, results for the best solution found (see
+            :meth:`get_incumbent_result`).
+        """
+
+        linear_constraints = self.get_linear_constraints()
+        if linear_constraints is None:
+            return None
+        optimizer = branch_and_bound.BranchAndBound(qualities=self.qualities,
+                                                    linear_constraints=linear_constraints)
+        selected = optimizer.optimize(time_limit=time_limit)
+        return self.create_result(selected=selected, status=optimizer.status)
+
+    def optimize_milp(
+            self, time_limit: Optional[float] = None
+    ) -> Optional[Dict[str, Union[float, bool, Sequence[str]]]]:
+        """Optimize problem with a MILP solver
+
+        Sub-routine of :meth:`optimize` (with solver "milp").
+
+        Parameters
+        ----------
+        time_limit : Optional[float], optional
+            Maximum runtime of the solver in seconds. If None, no time limit.
+
+        Returns
+        -------
+        Optional[Dict[str, Union[float, bool, Sequence[str]]]]
+            Optimization results (see :meth:`optimize`), or None if some constraint cannot be
+            linearized. If the solver was aborted, results for the best solution found (see
+            :meth:`get_incumbent_result`).
+        """
+
+        model = milp.LinearModel(num_variables=len(self.variables))
+        try:
+            for constraint in self.constraints:
+                model.add_constraint(constraint)
+        except ValueError:  # expression type unknown to linearization
+            return None
+        selected = model.optimize(qualities=self.qualities, time_limit=time_limit)
+        return self.create_result(selected=selected, status=model.status)
+
+    def optimize_preprocessed(
+            self, timeout: Optional[float] = None, rlimit: Optional[int] = None
+    ) -> Dict[str, Union[float, bool, Sequence[str]]]:
+        """Optimize preprocessed problem
+
+        Sub-routine of :meth:`optimize` (if preprocessing was enabled during initialization).
+        Preprocesses the constraints (see :func:`preprocessing.preprocess`) and creates a problem
+        with the same settings, but only with the variables whose values are not fixed and the
+        simplified constraints. Optimizes this reduced problem and maps its results back, i.e.,
+        adds the variables fixed to true to the selected features (and their qualities to the
+        objective value). Metrics of the reduced problem are added to the metrics of this problem.
+
+        Parameters
+        ----------
+        timeout : Optional[float], optional
+            Maximum runtime in seconds. If None, no time limit.
+        rlimit : Optional[int], optional
+            Maximum number of Z3 resource units. If None, no resource limit.
+
+        Returns
+        -------
+        Dict[str, Union[float, bool, Sequence[str]]]
+            Optimization results (see :meth:`optimize`).
+        """
+
+        start_time = time.perf_counter()
+        preprocessing_result = preprocessing.preprocess(self.constraints, qualities=self.qualities)
+        self.add_metric('preprocessing_time', time.perf_counter() - start_time)
+        if not preprocessing_result.is_feasible:  # like "unsat" in optimize()
+            return {'objective_value': 0, 'num_selected': 0, 'selected': []}
+        fixed_values = preprocessing_result.fixed_values
+        self.metrics['num_fixed_variables'] = len(fixed_values)
+        free_indices = [i for i in range(len(self.variables)) if i not in fixed_values]
+        if len(free_indices) == 0:  # no constraints left
+            reduced_result = {'objective_value': 0, 'num_selected': 0, 'selected': []}
+        else:
+            reduced_problem = Problem(
+                variable_names=[self.variables[i].get_name() for i in free_indices],
+                qualities=[self.qualities[i] for i in free_indices], solver=self.solver,
+                quality_precision=self.quality_precision, portfolio=self.portfolio)
+            # Re-create constraints with the variables of the reduced problem (other indices):
+            reduced_indices = {x.get_name(): x.index for x in reduced_problem.get_variables()}
+            data = expr.serialize(preprocessing_result.constraints)
+            for node in data['nodes']:
+                if node[0] == 'Variable':
+                    node[2] = reduced_indices[node[1]]
+            for constraint in expr.deserialize(data, variables=reduced_problem.get_variables()):
+                reduced_problem.add_constraint(constraint)
+            reduced_result = reduced_problem.optimize(
+                timeout=None if timeout is None else timeout - (time.perf_counter() - start_time),
+                rlimit=rlimit)
+            for name, value in reduced_problem.metrics.items():
+                if name == 'z3_max_memory_mb':
+                    self.metrics[name] = max(self.metrics.get(name, 0), value)
+                elif name != 'solve_time':  # runtime of this method is measured by optimize()
+                    self.add_metric(name, value)
+        # Reduced problem without selected variables might also mean "no solution (found)":
+        has_solution = (reduced_result['num_selected'] > 0) or all(
+            x.value for x in preprocessing.simplify(preprocessing_result.constraints,
+                                                    fixed_values={i: False for i in free_indices}))
+        fixed_selected = [i for i, value in fixed_values.items() if value]
+        if has_solution:
+            variable_indices = {x.get_name(): x.index for x in self.variables}
+            result = self.create_result(selected=sorted(
+                fixed_selected + [variable_indices[x] for x in reduced_result['selected']]),
+                status='optimal')
+        else:
+            result = {'objective_value': 0, 'num_selected': 0, 'selected': []}
+        if 'proven_optimal' in reduced_result:  # budget provided; bound of reduced problem
+            if reduced_result['proven_optimal']:  # optimal or infeasible (avoid float rounding)
+                result['upper_bound'] = result['objective_value']
+            else:
+                result['upper_bound'] = max(
+                    reduced_result['upper_bound'] + branch_and_bound.compute_objective_value(
+                        qualities=self.qualities, selected=fixed_selected),
+                    result['objective_value'])  # float rounding
+            result['gap'] = result['upper_bound'] - result['objective_value']
+            result['proven_optimal'] = reduced_result['proven_optimal']
+        return result
+
+    def create_result(self, selected: Optional[Sequence[int]],
+                      status: str) -> Dict[str, Union[float, bool, Sequence[str]]]:
+        """Create optimization results from selected variables
+
+        Sub-routine of :meth:`optimize` for solvers other than Z3.
+
+        Parameters
+        ----------
+        selected : Optional[Sequence[int]]
+            Indices of the selected variables.
+        status : str
+            Status of the solver: "optimal", "infeasible", or "aborted".
+
+        Returns
+        -------
+        Dict[str, Union[float, bool, Sequence[str]]]
+            Optimization results (see :meth:`optimize`); if the status is "aborted", for the best
+            solution found (no features selected if there is none) plus bound information.
+        """
+
+        if status == 'infeasible':  # no valid assignment, like "unsat" in Z3
+            return {'objective_value': 0, 'num_selected': 0, 'selected': []}
+        if status != 'optimal':
+            return self.get_incumbent_result(selected=selected)
+        return {'objective_value': branch_and_bound.compute_objective_value(
+                    qualities=self.qualities, selected=selected),
+                'num_selected': len(selected),
+                'selected': [self.variables[i].get_name() for i in selected]}
+
+    def compute_solution_fraction(self, method: str = 'auto',
+                                  num_processes: Optional[int] = None) -> float:
+        """Compute fraction of solutions
+
+        See :meth:`solving.Problem.compute_solution_fraction`. If preprocessing was enabled during
+        initialization (and counting is not incremental), counts the solutions of the simplified
+        constraints instead (see :func:`preprocessing.preprocess`, without fixing variables based
+        on qualities), where each fixed variable has one instead of two possible values.
+
+        Parameters
+        ----------
+        method : str, optional
+            Counting method; see :meth:`solving.Problem.compute_solution_fraction`.
+        num_processes : Optional[int], optional
+            Number of processes for the method "parallel".
+
+        Returns
+        -------
+        float
+            The fraction of solutions in [0, 1].
+        """
+
+        if (not self.preprocess) or (self.solution_bitmap is not None):
+            return super().compute_solution_fraction(method=method, num_processes=num_processes)
+        start_time = time.perf_counter()
+        preprocessing_result = preprocessing.preprocess(self.constraints)
+        self.add_metric('preprocessing_time', time.perf_counter() - start_time)
+        if not preprocessing_result.is_feasible:
+            return 0.0
+        reduced_problem = solving.Problem(variable_names=[x.get_name() for x in self.variables])
+        for constraint in preprocessing_result.constraints:  # same variable indices
+            reduced_problem.add_constraint(constraint)
+        fraction = reduced_problem.compute_solution_fraction(method=method,
+                                                             num_processes=num_processes)
+        self.add_metric('counting_time', reduced_problem.metrics['counting_time'])
+        # Fixed variables do not occur in the constraints, so they are counted as free ones:
+        return fraction / 2 ** len(preprocessing_result.fixed_values)
+
+    def approximate_solution_fraction(self, epsilon: float = 0.8, delta: float = 0.2,
+                                      seed: Optional[int] = None) -> float:
+        """Approximate fraction of solutions with hashing
+
+        Approximately determine the fraction of solutions (see
+        :meth:`solving.Problem.compute_solution_fraction`) with an ApproxMC-style model counter
+        based on Z3, which scales to many more variables than enumeration and, unlike random
+        sampling (see :meth:`solving.Problem.estimate_solution_fraction`), also works for tiny
+        fractions of solutions. The space of assignments to the constrained variables is
+        partitioned into 2^m cells by m random XOR constraints (hash functions); the solutions in
+        one cell are counted with blocking clauses up to a threshold (see
+        :func:`count_solutions_bounded`), where m is chosen such that the cell is small enough.
+        The number of solutions in the cell times 2^m estimates the total number of solutions.
+        Repeats with independent hash functions and returns the median estimate. If the number of
+        solutions is below the threshold without hashing, returns the exact fraction.
+
+        Parameters
+        ----------
+        epsilon : float, optional
+            Tolerance: With probability at least 1 - `delta`, the returned fraction is in
+            [exact / (1 + epsilon), exact * (1 + epsilon)].
+        delta : float, optional
+            Confidence parameter in (0, 1); see `epsilon`.
+        seed : Optional[int], optional
+            Seed for the random hash functions.
+
+        Returns
+        -------
+        float
+            The (approximate) fraction of solutions in [0, 1].
+        """
+
+        start_time = time.perf_counter()
+        threshold = math.ceil(1 + 9.84 * (1 + epsilon / (1 + epsilon)) * (1 + 1 / epsilon) ** 2)
+        num_iterations = math.ceil(17 * math.log2(3 / delta))
+        variables = [self.variables[i] for _, variable_indices
+                     in counting.get_components(self.constraints) for i in sorted(variable_indices)]
+        z3_variables = [x.get_z3() for x in variables]
+        solver = z3.Solver()
+        solver.add([x.get_z3() for x in self.constraints])
+        num_solutions = count_solutions_bounded(solver=solver, variables=z3_variables,
+                                                limit=threshold)
+        if num_solutions < threshold:  # exact result
+            self.add_metric('counting_time', time.perf_counter() - start_time)
+            return num_solutions / 2 ** len(variables)
+        rng = random.Random(seed)
+        estimates = []
+        num_hashes = 1
+        for _ in range(num_iterations):
+            # Hash functions for 2^m cells are the first m XORs, so cells are nested and the number
+            # of solutions in the cell decreases monotonically with m
+            hash_constraints = [create_random_xor(variables=z3_variables, rng=rng)
+                                for _ in range(len(variables))]
+            cell_counts = {0: num_solutions}
+
+            def count_cell_solutions(m: int) -> int:
+                if m not in cell_counts:
+                    solver.push()
+                    solver.add(hash_constraints[:m])
+                    cell_counts[m] = count_solutions_bounded(solver=solver, variables=z3_variables,
+                                                             limit=threshold)
+                    solver.pop()
+                return cell_counts[m]
+
+            # Search smallest m such that cell is small enough, starting from previous iteration's
+            num_hashes = min(max(num_hashes, 1), len(variables))
+            while num_hashes < len(variables) and count_cell_solutions(num_hashes) >= threshold:
+                num_hashes += 1
+            while count_cell_solutions(num_hashes - 1) < threshold:
+                num_hashes -= 1
+            if count_cell_solutions(num_hashes) < threshold:  # else no valid m (very unlikely)
+                estimates.append(count_cell_solutions(num_hashes) * 2 ** num_hashes)
+        self.add_metric('counting_time', time.perf_counter() - start_time)
+        if len(estimates) == 0:
+            return float('nan')
+        return statistics.median(estimates) / 2 ** len(variables)
+
+
+def create_random_xor(variables: Sequence[z3.BoolRef], rng: random.Random) -> z3.BoolRef:
+    """Create random XOR constraint
+
+    Creates a hash function from the family of random XOR constraints: Each variable is included
+    in the XOR with probability 0.5, and the XOR's result should equal a random bit.
+
+    Parameters
+    ----------
+    variables : Sequence[z3.BoolRef]
+        Z3 decision variables.
+    rng : random.Random
+        Random number generator.
+
+    Returns
+    -------
+    z3.BoolRef
+        The XOR constraint.
+    """
+
+    parity = rng.random() < 0.5
+    result = None
+    for variable in variables:
+        if rng.random() < 0.5:
+            result = variable if result is None else z3.Xor(result, variable)
+    if result is None:  # XOR of zero variables is false
+        return z3.BoolVal(not parity)
+    return result if parity else z3.Not(result)
+
+
+def count_solutions_bounded(solver: z3.Solver, variables: Sequence[z3.BoolRef],
+                            limit: int) -> int:
+    """Count solutions up to limit
+
+    Repeatedly finds a solution with Z3 and excludes it with a blocking clause, until there are no
+    more solutions or the limit is reached. Leaves the assertions of the solver unchanged.
+
+    Parameters
+    ----------
+    solver : z3.Solver
+        Solver holding the constraints.
+    variables : Sequence[z3.BoolRef]
+        Z3 decision variables, i.e., solutions differing in other variables are not distinguished.
+    limit : int
+        Maximum number of solutions to be found.
+
+    Returns
+    -------
+    int
+        The number of solutions (if less than `limit`) or `limit`.
+    """
+
+    num_solutions = 0
+    solver.push()
+    while num_solutions < limit and solver.check() == z3.sat:
+        num_solutions += 1
+        model = solver.model()
+        solver.add(z3.Or([z3.Not(x) if z3.is_true(model.eval(x, model_completion=True)) else x
+                          for x in variables]))
+    solver.pop()
+    return num_solutions
+
+
+def run_portfolio_member(task: Tuple[str, Dict[str, Any], Optional[int], Optional[int],
+                                     Sequence[str]],
+                         result_queue: multiprocessing.SimpleQueue) -> None:
+    """Optimize problem in SMT-LIB format and report result
+
+    Target of the worker processes in :meth:`Problem.optimize_portfolio`. Puts the result of
+    :func:`optimize_smtlib` into the queue, or ("error", message) if Z3 raises an exception (e.g.,
+    due to an invalid parameter in the configuration).
+
+    Parameters
+    ----------
+    task : Tuple[str, Dict[str, Any], Optional[int], Optional[int], Sequence[str]]
+        Arguments for :func:`optimize_smtlib`.
+    result_queue : multiprocessing.SimpleQueue
+        Queue shared with the parent process.
+    """
+
+    try:
+        result_queue.put(optimize_smtlib(task))
+    except z3.Z3Exception as error:
+        result_queue.put(('error', str(error)))
+
+
+def optimize_smtlib(task: Tuple[str, Dict[str, Any], Optional[int], Optional[int],
+                                Sequence[str]]) -> Tuple[str, Optional[List[int]]]:
+    """Optimize problem in SMT-LIB format with a Z3 configuration
+
+    Sub-routine of :func:`run_portfolio_member`, run in a worker process. The configuration
+    is set globally, which only affects this process.
+
+    Parameters
+    ----------
+    task : Tuple[str, Dict[str, Any], Optional[int], Optional[int], Sequence[str]]
+        The problem (assertions and objective in SMT-LIB format), the Z3 configuration (parameter
+        names and values), the timeout (in milliseconds), the resource limit, and the names of the
+        decision variables.
+
+    Returns
+    -------
+    Tuple[str, Optional[List[int]]]
+        The result of Z3's check ("sat", "unsat", or "unknown") and the indices of the selected
+        variables in the (best) solution found, or None if no solution was found.
+    """
+
+    smtlib, config, timeout, rlimit, variable_names = task
+    for name, value in config.items():
+        z3.set_param(name, value)
+    optimizer = z3.Optimize()
+    if timeout is not None:
+        optimizer.set(timeout=timeout)
+    if rlimit is not None:
+        optimizer.set(rlimit=rlimit)
+    optimizer.from_string(smtlib)
+    status = optimizer.check()
+    try:
+        model = optimizer.model()
+    except z3.Z3Exception:  # unsat or no solution found yet
+        return str(status), None
+    values = {x.name(): model[x] for x in model.decls()}  # variables not in model are false
+    return str(status), [i for i, name in enumerate(variable_names)
+                         if z3.is_true(values.get(name, False))]
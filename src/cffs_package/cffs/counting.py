@@ -0,0 +1,632 @@
+"""Solution counting
+
+Functions to count the number of valid assignments (solutions) of boolean decision variables under
+a set of constraints from :mod:`expressions`. Used by :mod:`solving` to compute the fraction of
+solutions of a problem.
+
+Literature
+----------
+- Bach et al. (2022): "An Empirical Evaluation of Constrained Feature Selection"
+- Bryant (1986): "Graph-Based Algorithms for Boolean Function Manipulation"
+- Brown et al. (2001): "Interval Estimation for a Binomial Proportion"
+- Gomes et al. (2009): "Model Counting"
+- Knuth (2011): "The Art of Computer Programming, Volume 4A: Combinatorial Algorithms, Part 1"
+"""
+
+import multiprocessing
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import scipy.special
+import scipy.stats
+
+from . import bdd
+from . import expressions as expr
+
+
+CHUNK_SIZE = 2 ** 16  # number of assignments evaluated at once during enumeration
+MAX_DP_STATES = 2 ** 16  # number of partial-sum states in dynamic program for linear constraints
+TASKS_PER_PROCESS = 4  # number of sub-spaces per process in parallel counting (load balancing)
+
+worker_state = {}  # constraints etc. of a worker process in parallel counting
+
+
+class SolutionBitmap:
+    """Bitmap of solutions
+
+    Stores for each assignment to the decision variables whether it satisfies all constraints
+    added so far, as one bit in a packed array (2^n bits). Adding a constraint only evaluates the
+    assignments that are still valid, so the cost of maintaining the number of solutions while
+    adding constraints one by one is proportional to the remaining solutions rather than to the
+    number of constraints. Memory consumption grows exponentially with the number of variables.
+    Assignment i sets the j-th variable (of n) to the j-th most significant bit of i.
+    """
+
+    def __init__(self, num_variables: int, chunk_size: int = CHUNK_SIZE):
+        """Initialize bitmap
+
+        Creates a bitmap in which all assignments are valid (no constraints).
+
+        Parameters
+        ----------
+        num_variables : int
+            Number of decision variables.
+        chunk_size : int, optional
+            Maximum number of assignments evaluated at once when adding a constraint.
+        """
+
+        self.num_variables = num_variables
+        self.chunk_size = max(chunk_size // 8, 1) * 8  # full bytes
+        self.bitmap = np.empty((2 ** num_variables + 7) // 8, dtype=np.uint8)
+        self.clear()
+
+    def clear(self) -> None:
+        """Clear constraints
+
+        Makes all assignments valid again, re-using the memory of the bitmap.
+        """
+
+        self.bitmap.fill(0xFF)
+        num_padding_bits = len(self.bitmap) * 8 - 2 ** self.num_variables
+        self.bitmap[-1] &= (0xFF << num_padding_bits) & 0xFF  # padding (least significant) bits 0
+        self.num_solutions = 2 ** self.num_variables
+
+    def add_constraint(self, constraint: expr.BooleanExpression) -> int:
+        """Add a constraint
+
+        Evaluates the constraint for all assignments that are valid so far (in vectorized chunks)
+        and removes the assignments violating the constraint.
+
+        Parameters
+        ----------
+        constraint : expr.BooleanExpression
+            The constraint. Its variables need indices.
+
+        Returns
+        -------
+        int
+            The number of valid assignments after adding the constraint.
+        """
+
+        chunk_bytes = self.chunk_size // 8
+        for start in range(0, len(self.bitmap), chunk_bytes):
+            chunk = self.bitmap[start:start + chunk_bytes]
+            if not chunk.any():
+                continue  # no valid assignments left in chunk
+            bits = np.unpackbits(chunk).astype(bool)
+            positions = np.flatnonzero(bits)
+            packed_assignments = positions.astype(np.uint64) + np.uint64(start * 8)
+            assignments = np.empty((len(positions), self.num_variables), dtype=bool, order='F')
+            for j in range(self.num_variables):  # first variable is most significant bit
+                shift = np.uint64(self.num_variables - 1 - j)
+                assignments[:, j] = (packed_assignments >> shift) & np.uint64(1)
+            satisfied = constraint.is_true_batch(assignments)
+            bits[positions[~satisfied]] = False
+            self.num_solutions -= int(np.count_nonzero(~satisfied))
+            self.bitmap[start:start + chunk_bytes] = np.packbits(bits)
+        return self.num_solutions
+
+    def get_num_solutions(self) -> int:
+        """Get number of solutions
+
+        Returns
+        -------
+        int
+            The number of valid assignments under the constraints added so far, in [0, 2^n].
+        """
+
+        return self.num_solutions
+
+
+def get_components(constraints: Sequence[expr.BooleanExpression]) -> List[Tuple[List[int],
+                                                                                List[int]]]:
+    """Get independent components of constraints
+
+    Partitions the constraints into components such that constraints from different components do
+    not share variables (connected components of the graph in which constraints sharing a variable
+    are adjacent). As components are independent, their numbers of solutions can be counted
+    separately and multiplied.
+
+    Parameters
+    ----------
+    constraints : Sequence[expr.BooleanExpression]
+        The constraints. Their variables need indices.
+
+    Returns
+    -------
+    List[Tuple[List[int], List[int]]]
+        For each component, the positions of its constraints in `constraints` and the (sorted)
+        indices of its variables. Each constraint without variables forms a separate component.
+    """
+
+    parents = {}  # union-find forest over variable indices
+
+    def find(index: int) -> int:
+        root = index
+        while parents[root] != root:
+            root = parents[root]
+        while parents[index] != root:  # path compression
+            parents[index], index = root, parents[index]
+        return root
+
+    constraint_variables = []
+    for constraint in constraints:
+        indices = sorted(set(x.index for x in expr.get_involved_variables(constraint)))
+        constraint_variables.append(indices)
+        for index in indices:
+            parents.setdefault(index, index)
+        for index in indices[1:]:
+            parents[find(index)] = find(indices[0])
+    components = {}  # map root variable of component to constraint positions and variables
+    for position, indices in enumerate(constraint_variables):
+        root = find(indices[0]) if len(indices) > 0 else -1 - position
+        components.setdefault(root, ([], []))[0].append(position)
+    for index in parents:
+        components[find(index)][1].append(index)
+    return [(positions, sorted(indices)) for positions, indices in components.values()]
+
+
+def count_solutions_enumeration(constraints: Sequence[expr.BooleanExpression],
+                                variable_indices: Sequence[int], num_variables: int,
+                                chunk_size: int = CHUNK_SIZE,
+                                fixed_values: Optional[Dict[int, bool]] = None) -> int:
+    """Count solutions by exhaustive enumeration
+
+    Enumerates all 2^k assignments to the k decision variables with the provided indices and
+    counts the assignments that satisfy all constraints. The assignment space is processed in
+    chunks of (at most) `chunk_size` assignments, each of which is evaluated with the vectorized
+    methods of the expressions (:meth:`expressions.BooleanExpression.is_true_batch`), so memory
+    consumption is bounded independently from the number of variables. Within a chunk, the
+    assignments are bit-packed integers (`uint64`), whose bits are unpacked into the columns of
+    the enumerated variables; the variables beyond the chunk's bit width are fixed per chunk.
+
+    Parameters
+    ----------
+    constraints : Sequence[expr.BooleanExpression]
+        The constraints, which are combined by AND. Should only involve variables whose index is
+        in `variable_indices`.
+    variable_indices : Sequence[int]
+        Indices of the decision variables to be enumerated (columns in the assignment arrays).
+    num_variables : int
+        Total number of decision variables, i.e., number of columns in the assignment arrays.
+        Columns not in `variable_indices` are always false (unless in `fixed_values`).
+    chunk_size : int, optional
+        Maximum number of assignments evaluated at once. Is rounded down to a power of two.
+    fixed_values : Optional[Dict[int, bool]], optional
+        Constant values for decision variables not in `variable_indices`, e.g., to only enumerate
+        a sub-space of the assignments of a larger set of variables.
+
+    Returns
+    -------
+    int
+        The number of valid assignments to the enumerated variables, in [0, 2^k].
+    """
+
+    variable_indices = list(variable_indices)
+    num_chunk_bits = min(len(variable_indices), max(chunk_size, 1).bit_length() - 1)
+    num_fixed_bits = len(variable_indices) - num_chunk_bits
+    fixed_indices = variable_indices[:num_fixed_bits]  # most significant bits, constant per chunk
+    chunk_indices = variable_indices[num_fixed_bits:]  # least significant bits, vary within chunk
+    # Unpack the bits of the packed assignments within the chunk once, as they are the same for
+    # each chunk (only the fixed variables change between chunks); column-major order makes the
+    # column of each variable a contiguous array:
+    packed_assignments = np.arange(2 ** num_chunk_bits, dtype=np.uint64)
+    assignments = np.zeros((len(packed_assignments), num_variables), dtype=bool, order='F')
+    for i, variable_idx in enumerate(chunk_indices):
+        shift = np.uint64(num_chunk_bits - 1 - i)
+        assignments[:, variable_idx] = (packed_assignments >> shift) & np.uint64(1)
+    if fixed_values is not None:
+        for variable_idx, value in fixed_values.items():
+            assignments[:, variable_idx] = value
+    solutions = 0
+    for chunk in range(2 ** num_fixed_bits):
+        for i, variable_idx in enumerate(fixed_indices):
+            assignments[:, variable_idx] = (chunk >> (num_fixed_bits - 1 - i)) & 1
+        satisfied = np.ones(len(assignments), dtype=bool)
+        for constraint in constraints:
+            satisfied &= constraint.is_true_batch(assignments)
+        solutions += int(np.count_nonzero(satisfied))
+    return solutions
+
+
+def init_counting_worker(constraints: Sequence[expr.BooleanExpression],
+                         prefix_indices: Sequence[int], variable_indices: Sequence[int],
+                         num_variables: int, chunk_size: int) -> None:
+    """Initialize worker process for parallel counting
+
+    Sub-routine of :func:`count_solutions_parallel`. Stores the arguments as well as compiled
+    versions of the constraints in the process-wide :data:`worker_state`, so they are only
+    transferred (and compiled) once per process rather than once per task.
+
+    Parameters
+    ----------
+    constraints : Sequence[expr.BooleanExpression]
+        The constraints, which are combined by AND.
+    prefix_indices : Sequence[int]
+        Indices of the decision variables that are fixed per task.
+    variable_indices : Sequence[int]
+        Indices of the decision variables enumerated within each task.
+    num_variables : int
+        Total number of decision variables.
+    chunk_size : int
+        Maximum number of assignments evaluated at once.
+    """
+
+    worker_state['constraints'] = [expr.CompiledExpression(x) for x in constraints]
+    worker_state['prefix_indices'] = prefix_indices
+    worker_state['variable_indices'] = variable_indices
+    worker_state['num_variables'] = num_variables
+    worker_state['chunk_size'] = chunk_size
+
+
+def count_prefix_solutions(prefix: int) -> int:
+    """Count solutions in sub-space of assignments
+
+    Sub-routine of :func:`count_solutions_parallel`, executed in a worker process initialized with
+    :func:`init_counting_worker`.
+
+    Parameters
+    ----------
+    prefix : int
+        Values of the fixed decision variables, encoded as bits (the first variable corresponds
+        to the most significant bit).
+
+    Returns
+    -------
+    int
+        The number of valid assignments to the enumerated variables, given the fixed variables.
+    """
+
+    prefix_indices = worker_state['prefix_indices']
+    fixed_values = {variable_idx: bool((prefix >> (len(prefix_indices) - 1 - i)) & 1)
+                    for i, variable_idx in enumerate(prefix_indices)}
+    return count_solutions_enumeration(
+        constraints=worker_state['constraints'], variable_indices=worker_state['variable_indices'],
+        num_variables=worker_state['num_variables'], chunk_size=worker_state['chunk_size'],
+        fixed_values=fixed_values)
+
+
+def count_solutions_parallel(constraints: Sequence[expr.BooleanExpression],
+                             variable_indices: Sequence[int], num_variables: int,
+                             num_processes: Optional[int] = None,
+                             num_prefix_variables: Optional[int] = None,
+                             chunk_size: int = CHUNK_SIZE) -> int:
+    """Count solutions by exhaustive enumeration in multiple processes
+
+    Partitions the 2^k assignments to the k decision variables by fixing the first few of these
+    variables (prefix), enumerates each of the resulting sub-spaces in a process pool (see
+    :func:`count_solutions_enumeration`), and sums the partial counts. The constraints are sent
+    to (and compiled in) each worker process once rather than once per sub-space. Cannot be used
+    from a daemonic process, e.g., a worker of another process pool. If there are too few
+    variables to fill more than one chunk, counts in the current process instead.
+
+    Parameters
+    ----------
+    constraints : Sequence[expr.BooleanExpression]
+        The constraints, which are combined by AND. Should only involve variables whose index is
+        in `variable_indices`. Need to be picklable if processes are not forked.
+    variable_indices : Sequence[int]
+        Indices of the decision variables to be enumerated (columns in the assignment arrays).
+    num_variables : int
+        Total number of decision variables, i.e., number of columns in the assignment arrays.
+    num_processes : Optional[int], optional
+        Number of worker processes. If None, use the number of CPUs.
+    num_prefix_variables : Optional[int], optional
+        Number of fixed variables, resulting in 2^prefix sub-spaces (tasks). If None, choose such
+        that there are at least :data:`TASKS_PER_PROCESS` tasks per process.
+    chunk_size : int, optional
+        Maximum number of assignments evaluated at once (per process).
+
+    Returns
+    -------
+    int
+        The number of valid assignments to the enumerated variables, in [0, 2^k].
+    """
+
+    variable_indices = list(variable_indices)
+    if num_processes is None:
+        num_processes = os.cpu_count() or 1
+    if num_prefix_variables is None:
+        num_prefix_variables = max(num_processes * TASKS_PER_PROCESS - 1, 0).bit_length()
+    num_chunk_bits = max(chunk_size, 1).bit_length() - 1
+    num_prefix_variables = min(num_prefix_variables,
+                               max(len(variable_indices) - num_chunk_bits, 0))
+    if num_processes == 1 or num_prefix_variables == 0:
+        compiled_constraints = [expr.CompiledExpression(x) for x in constraints]
+        return count_solutions_enumeration(
+            constraints=compiled_constraints, variable_indices=variable_indices,
+            num_variables=num_variables, chunk_size=chunk_size)
+    init_args = (constraints, variable_indices[:num_prefix_variables],
+                 variable_indices[num_prefix_variables:], num_variables, chunk_size)
+    with multiprocessing.Pool(processes=num_processes, initializer=init_counting_worker,
+                              initargs=init_args) as process_pool:
+        return sum(process_pool.imap_unordered(count_prefix_solutions,
+                                               range(2 ** num_prefix_variables)))
+
+
+def count_solutions_gray_code(constraints: Sequence[expr.BooleanExpression],
+                              variable_indices: Sequence[int]) -> int:
+    """Count solutions by enumeration in Gray-code order
+
+    Enumerates all 2^k assignments to the k decision variables with the provided indices such that
+    consecutive assignments differ in exactly one variable (binary-reflected Gray code). Keeps the
+    truth value of each constraint and, after each flip, only re-evaluates the constraints
+    involving the flipped variable (scalar evaluation, pure Python). Pays off if there are many
+    constraints, each involving few variables.
+
+    Parameters
+    ----------
+    constraints : Sequence[expr.BooleanExpression]
+        The constraints, which are combined by AND. Should only involve variables whose index is
+        in `variable_indices`.
+    variable_indices : Sequence[int]
+        Indices of the decision variables to be enumerated.
+
+    Returns
+    -------
+    int
+        The number of valid assignments to the enumerated variables, in [0, 2^k].
+    """
+
+    variables = {}  # map indices to variable objects
+    variable_constraints = {index: [] for index in variable_indices}  # affected constraints
+    for position, constraint in enumerate(constraints):
+        for variable in expr.get_involved_variables(constraint):
+            variables[variable.index] = variable
+            if position not in variable_constraints[variable.index]:
+                variable_constraints[variable.index].append(position)
+    for variable in variables.values():
+        variable.value = False
+    satisfied = [constraint.is_true() for constraint in constraints]
+    num_violated = satisfied.count(False)
+    solutions = int(num_violated == 0)
+    num_free_variables = len(variable_indices) - len(variables)
+    variable_indices = [index for index in variable_indices if index in variables]
+    for step in range(1, 2 ** len(variable_indices)):
+        # Gray code flips the bit at the position of the lowest set bit of the step counter
+        variable = variables[variable_indices[(step & -step).bit_length() - 1]]
+        variable.value = not variable.value
+        for position in variable_constraints[variable.index]:
+            is_satisfied = constraints[position].is_true()
+            if is_satisfied != satisfied[position]:
+                num_violated += -1 if is_satisfied else 1
+                satisfied[position] = is_satisfied
+        solutions += num_violated == 0
+    return solutions * 2 ** num_free_variables
+
+
+def count_solutions_linear(linear_constraints: Sequence[expr.LinearConstraint],
+                           variable_indices: Sequence[int],
+                           max_states: int = MAX_DP_STATES) -> Optional[int]:
+    """Count solutions of linear constraints combinatorially
+
+    For a single cardinality constraint (all weights one), sums binomial coefficients. Else, runs
+    a dynamic program over the variables (in the provided order), whose states are the partial
+    sums of all constraints that are not decided yet, i.e., where the remaining variables can
+    still make the constraint true or false. Thus, the number of states depends on the range of
+    the weighted sums rather than the number of assignments.
+
+    Parameters
+    ----------
+    linear_constraints : Sequence[expr.LinearConstraint]
+        The constraints, which are combined by AND (see :func:`expressions.get_linear_constraints`).
+        Weights need to be integers (in terms of their value). Should only involve variables whose
+        index is in `variable_indices`.
+    variable_indices : Sequence[int]
+        Indices of the decision variables whose assignments should be counted. The order of
+        indices is the processing order of the dynamic program; ideally, variables occurring in
+        the same constraints should be close to each other.
+    max_states : int, optional
+        Maximum number of states of the dynamic program. If exceeded, counting is aborted.
+
+    Returns
+    -------
+    Optional[int]
+        The number of valid assignments to the variables with the provided indices, in [0, 2^k],
+        or None if weights are not integers or the number of states is exceeded.
+    """
+
+    if any(w != int(w) for constraint in linear_constraints for w in constraint.weights.values()):
+        return None  # floating-point sums might differ from the evaluation of the expressions
+    linear_constraints = [expr.LinearConstraint(
+        weights={index: int(w) for index, w in constraint.weights.items() if w != 0},
+        lower=constraint.lower, upper=constraint.upper) for constraint in linear_constraints]
+    # Closed form for one cardinality constraint: choose number of true variables
+    if (len(linear_constraints) == 1) and\
+            all(w == 1 for w in linear_constraints[0].weights.values()):
+        weights, lower, upper = linear_constraints[0]
+        num_free_variables = len(variable_indices) - len(weights)
+        return sum(scipy.special.comb(len(weights), j, exact=True) for j in range(len(weights) + 1)
+                   if lower <= j <= upper) * 2 ** num_free_variables
+    # Dynamic program: for each constraint, the range of sums that remaining variables can add
+    positions = {index: position for position, index in enumerate(variable_indices)}
+    min_rest = [[0] * (len(variable_indices) + 1) for _ in linear_constraints]
+    max_rest = [[0] * (len(variable_indices) + 1) for _ in linear_constraints]
+    variable_terms = [[] for _ in variable_indices]  # (constraint, weight) for each variable
+    for i, constraint in enumerate(linear_constraints):
+        for index, weight in constraint.weights.items():
+            variable_terms[positions[index]].append((i, weight))
+            for position in range(positions[index] + 1):
+                min_rest[i][position] += min(weight, 0)
+                max_rest[i][position] += max(weight, 0)
+
+    def normalize(state: Tuple[Optional[int], ...], position: int) -> Optional[Tuple]:
+        # Mark constraints decided by the partial sums as None; return None if a constraint
+        # cannot be satisfied anymore
+        result = list(state)
+        for i, partial_sum in enumerate(state):
+            if partial_sum is not None:
+                lower, upper = linear_constraints[i].lower, linear_constraints[i].upper
+                min_sum = partial_sum + min_rest[i][position]
+                max_sum = partial_sum + max_rest[i][position]
+                if (max_sum < lower) or (min_sum > upper):
+                    return None
+                if (lower <= min_sum) and (max_sum <= upper):
+                    result[i] = None
+        return tuple(result)
+
+    initial_state = normalize(tuple(0 for _ in linear_constraints), 0)
+    if initial_state is None:
+        return 0
+    state_counts = {initial_state: 1}
+    for position, terms in enumerate(variable_terms):
+        new_state_counts = {}
+        for state, count in state_counts.items():
+            for value in (0, 1):
+                new_state = list(state)
+                for i, weight in terms:
+                    if new_state[i] is not None:
+                        new_state[i] += weight * value
+                new_state = normalize(tuple(new_state), position + 1)
+                if new_state is not None:
+                    new_state_counts[new_state] = new_state_counts.get(new_state, 0) + count
+        state_counts = new_state_counts
+        if len(state_counts) > max_states:
+            return None
+    return sum(state_counts.values())  # all constraints are decided after last variable
+
+
+def count_solutions_bdd(constraints: Sequence[expr.BooleanExpression],
+                        variable_indices: Sequence[int], num_variables: int) -> int:
+    """Count solutions with a binary decision diagram
+
+    Compiles the constraints into a reduced ordered binary decision diagram (see :class:`bdd.BDD`)
+    and counts the satisfying assignments in the diagram, which is exact and takes time linear in
+    the diagram's size. Compiling might be expensive for constraints without compact diagram,
+    but cardinality and pseudo-boolean constraints are translated natively. The variable order
+    follows a static heuristic (see :func:`bdd.get_variable_order`).
+
+    Parameters
+    ----------
+    constraints : Sequence[expr.BooleanExpression]
+        The constraints, which are combined by AND. Should only involve variables whose index is
+        in `variable_indices`.
+    variable_indices : Sequence[int]
+        Indices of the decision variables whose assignments should be counted.
+    num_variables : int
+        Total number of decision variables (the variables' indices are smaller).
+
+    Returns
+    -------
+    int
+        The number of valid assignments to the variables with the provided indices, in [0, 2^k].
+    """
+
+    diagram = bdd.BDD(num_variables=num_variables,
+                      variable_order=bdd.get_variable_order(constraints, num_variables))
+    root = bdd.BDD.TRUE
+    for constraint in constraints:
+        root = diagram.ite(root, diagram.compile(constraint), bdd.BDD.FALSE)
+        if root == bdd.BDD.FALSE:
+            break  # unsatisfiable, further constraints do not matter
+    # Diagram counts assignments to all variables, but the other variables are unconstrained:
+    return diagram.count_models(root) // 2 ** (num_variables - len(variable_indices))
+
+
+def compute_confidence_interval(num_successes: int, num_trials: int, confidence: float = 0.95,
+                                method: str = 'wilson') -> Tuple[float, float]:
+    """Compute confidence interval for a binomial proportion
+
+    Parameters
+    ----------
+    num_successes : int
+        Number of successful trials (e.g., valid assignments).
+    num_trials : int
+        Number of trials (e.g., sampled assignments). Should be positive.
+    confidence : float, optional
+        Confidence level in (0, 1).
+    method : str, optional
+        Either "wilson" (Wilson score interval) or "clopper-pearson" (exact interval based on the
+        beta distribution, more conservative).
+
+    Raises
+    ------
+    ValueError
+        If the method is unknown.
+
+    Returns
+    -------
+    Tuple[float, float]
+        The lower and upper bound of the interval, both in [0, 1].
+    """
+
+    alpha = 1 - confidence
+    if method == 'wilson':
+        z = scipy.stats.norm.ppf(1 - alpha / 2)
+        p = num_successes / num_trials
+        denominator = 1 + z ** 2 / num_trials
+        center = (p + z ** 2 / (2 * num_trials)) / denominator
+        half_width = z * np.sqrt(p * (1 - p) / num_trials + z ** 2 / (4 * num_trials ** 2)) /\
+            denominator
+        return max(0.0, float(center - half_width)), min(1.0, float(center + half_width))
+    if method == 'clopper-pearson':
+        lower = 0.0 if num_successes == 0 else\
+            scipy.stats.beta.ppf(alpha / 2, num_successes, num_trials - num_successes + 1)
+        upper = 1.0 if num_successes == num_trials else\
+            scipy.stats.beta.ppf(1 - alpha / 2, num_successes + 1, num_trials - num_successes)
+        return float(lower), float(upper)
+    raise ValueError(f'Unknown confidence-interval method "{method}".')
+
+
+def estimate_solutions_sampling(
+        constraints: Sequence[expr.BooleanExpression], num_variables: int,
+        max_iterations: int = 1000, batch_size: int = 1000, confidence: float = 0.95,
+        rel_precision: Optional[float] = None, interval_method: str = 'wilson',
+        rng: Optional[np.random.Generator] = None) -> Dict[str, float]:
+    """Estimate fraction of solutions by sampling
+
+    Uniformly samples assignments to all decision variables (with replacement) in batches,
+    evaluates each batch with the vectorized methods of the expressions, and estimates the fraction
+    of valid assignments, including a confidence interval. Optionally, stops before reaching the
+    maximum number of iterations once the interval is narrow enough.
+
+    Parameters
+    ----------
+    constraints : Sequence[expr.BooleanExpression]
+        The constraints, which are combined by AND.
+    num_variables : int
+        Total number of decision variables, i.e., number of columns in the assignment arrays.
+    max_iterations : int, optional
+        Maximum number of sampled assignments.
+    batch_size : int, optional
+        Number of assignments sampled and evaluated at once.
+    confidence : float, optional
+        Confidence level of the interval.
+    rel_precision : Optional[float], optional
+        If not None, stop sampling once the half-width of the interval is at most this fraction of
+        the estimate. The estimate needs to be positive for stopping early.
+    interval_method : str, optional
+        Type of confidence interval; see :func:`compute_confidence_interval`.
+    rng : Optional[np.random.Generator], optional
+        Random-number generator for sampling. If None, a new one is created (without fixed seed).
+
+    Returns
+    -------
+    Dict[str, float]
+        The estimated fraction of solutions ("estimate"), the bounds of its confidence interval
+        ("ci_lower", "ci_upper"), and the number of sampled assignments ("num_samples").
+    """
+
+    if rng is None:
+        rng = np.random.default_rng()
+    num_samples = 0
+    solutions = 0
+    lower, upper = 0.0, 1.0
+    while num_samples < max_iterations:
+        num_batch_samples = min(batch_size, max_iterations - num_samples)
+        # Sample transposed array, so the column of each variable is contiguous after transposing:
+        assignments = rng.integers(2, size=(num_variables, num_batch_samples), dtype=bool).T
+        satisfied = np.ones(num_batch_samples, dtype=bool)
+        for constraint in constraints:
+            satisfied &= constraint.is_true_batch(assignments)
+        solutions += int(np.count_nonzero(satisfied))
+        num_samples += num_batch_samples
+        lower, upper = compute_confidence_interval(
+            num_successes=solutions, num_trials=num_samples, confidence=confidence,
+            method=interval_method)
+        if (rel_precision is not None) and (solutions > 0) and\
+                ((upper - lower) / 2 <= rel_precision * solutions / num_samples):
+            break
+    return {'estimate': solutions / num_samples if num_samples > 0 else 0.0,
+            'ci_lower': lower, 'ci_upper': upper, 'num_samples': num_samples}
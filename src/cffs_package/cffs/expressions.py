@@ -13,16 +13,23 @@ Literature
 from __future__ import annotations  # to use a class as a type hint within its own definition
 
 from abc import ABCMeta, abstractmethod
-from typing import Sequence
+import math
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
 
 
 class Expression(metaclass=ABCMeta):
     """SMT expression
 
     Should evaluate to an arithmetic or boolean value (subclasses should implement corresponding
-    evaluation methods). Can nest multiple child expressions.
+    evaluation methods). Can nest multiple child expressions. Expressions define `__slots__` to
+    keep the memory footprint of nodes small; subclasses without `__slots__` still work but get an
+    instance dictionary.
     """
 
+    __slots__ = ()
+
     def get_children(self) -> Sequence[Expression]:
         """Get child expressions
 
@@ -47,6 +54,8 @@ class BooleanExpression(Expression, metaclass=ABCMeta):
     Evaluates to true or false.
     """
 
+    __slots__ = ()
+
     @abstractmethod
     def is_true(self) -> bool:
         """Evaluate boolean expression
@@ -68,6 +77,34 @@ class BooleanExpression(Expression, metaclass=ABCMeta):
 
         raise NotImplementedError('Abstract method.')
 
+    def is_true_batch(self, assignments: np.ndarray) -> np.ndarray:
+        """Evaluate boolean expression for multiple assignments
+
+        Vectorized counterpart of :meth:`is_true`. Evaluates the expression for multiple
+        assignments of values to the decision variables at once. By default, falls back to
+        assigning each row to the involved variables and calling :meth:`is_true`; subclasses
+        should override this method with array operations for efficiency.
+
+        Parameters
+        ----------
+        assignments : np.ndarray
+            Two-dimensional boolean array. Each row is an assignment, each column corresponds to
+            the decision variable with the same index (see :class:`Variable`).
+
+        Returns
+        -------
+        np.ndarray
+            One-dimensional boolean array with the value of the expression for each assignment.
+        """
+
+        variables = set(get_involved_variables(self))
+        result = np.zeros(len(assignments), dtype=bool)
+        for i, assignment in enumerate(assignments):
+            for variable in variables:
+                variable.value = bool(assignment[variable.index])
+            result[i] = self.is_true()
+        return result
+
 
 class BooleanValue(BooleanExpression):
     """Boolean value
@@ -76,12 +113,17 @@ class BooleanValue(BooleanExpression):
     child expressions.
     """
 
+    __slots__ = ('value',)
+
     def __init__(self, value: bool):
         self.value = value
 
     def is_true(self) -> bool:
         return self.value
 
+    def is_true_batch(self, assignments: np.ndarray) -> np.ndarray:
+        return np.full(len(assignments), bool(self.value))
+
     def __bool__(self) -> bool:
         return self.is_true()
 
@@ -90,12 +132,16 @@ class Variable(BooleanValue):
     """Boolean variable
 
     A boolean value with an additional name attribute. Represents a decision variable in the
-    optimization problem of constrained feature selection.
+    optimization problem of constrained feature selection. The optional index attribute denotes
+    the column of the variable in assignment arrays (used for vectorized evaluation).
     """
 
-    def __init__(self, name: str):
+    __slots__ = ('name', 'index')
+
+    def __init__(self, name: str, index: Optional[int] = None):
         super().__init__(value=False)
         self.name = name
+        self.index = index
 
     def get_name(self) -> str:
         """Get name
@@ -108,6 +154,11 @@ class Variable(BooleanValue):
 
         return self.name
 
+    def is_true_batch(self, assignments: np.ndarray) -> np.ndarray:
+        if self.index is None:
+            raise ValueError(f'Variable "{self.name}" has no index for vectorized evaluation.')
+        return assignments[:, self.index]
+
     def __str__(self) -> str:
         return self.name
 
@@ -119,6 +170,8 @@ class And(BooleanExpression):
     arbitrary number of child expressions.
     """
 
+    __slots__ = ('bool_expressions',)
+
     def __init__(self, bool_expressions: Sequence[BooleanExpression]):
         self.bool_expressions = bool_expressions
 
@@ -128,6 +181,12 @@ class And(BooleanExpression):
                 return False
         return True  # no child expression evaluates to False
 
+    def is_true_batch(self, assignments: np.ndarray) -> np.ndarray:
+        result = np.ones(len(assignments), dtype=bool)
+        for bool_expression in self.bool_expressions:
+            result &= bool_expression.is_true_batch(assignments)
+        return result
+
     def get_children(self) -> Sequence[Expression]:
         return self.bool_expressions
 
@@ -140,6 +199,8 @@ class Iff(BooleanExpression):
     expressions.
     """
 
+    __slots__ = ('bool_expressions',)
+
     def __init__(self, bool_expressions: Sequence[BooleanExpression]):
         self.bool_expressions = bool_expressions
 
@@ -150,6 +211,13 @@ class Iff(BooleanExpression):
                 return False
         return True  # all child expressions evaluate to same value
 
+    def is_true_batch(self, assignments: np.ndarray) -> np.ndarray:
+        joint_values = self.bool_expressions[0].is_true_batch(assignments)
+        result = np.ones(len(assignments), dtype=bool)
+        for bool_expression in self.bool_expressions[1:]:
+            result &= bool_expression.is_true_batch(assignments) == joint_values
+        return result
+
     def get_children(self) -> Sequence[Expression]:
         return self.bool_expressions
 
@@ -161,6 +229,8 @@ class Implies(BooleanExpression):
     child expression evaluates to true. Has exactly two child expressions.
     """
 
+    __slots__ = ('bool_expression1', 'bool_expression2')
+
     def __init__(self, bool_expression1: BooleanExpression, bool_expression2: BooleanExpression):
         self.bool_expression1 = bool_expression1
         self.bool_expression2 = bool_expression2
@@ -168,6 +238,10 @@ class Implies(BooleanExpression):
     def is_true(self) -> bool:
         return (not self.bool_expression1.is_true()) or self.bool_expression2.is_true()
 
+    def is_true_batch(self, assignments: np.ndarray) -> np.ndarray:
+        return (~self.bool_expression1.is_true_batch(assignments) |
+                self.bool_expression2.is_true_batch(assignments))
+
     def get_children(self) -> Sequence[Expression]:
         return [self.bool_expression1, self.bool_expression2]
 
@@ -179,12 +253,17 @@ class Not(BooleanExpression):
     expression.
     """
 
+    __slots__ = ('bool_expression',)
+
     def __init__(self, bool_expression: BooleanExpression):
         self.bool_expression = bool_expression
 
     def is_true(self) -> bool:
         return not self.bool_expression.is_true()
 
+    def is_true_batch(self, assignments: np.ndarray) -> np.ndarray:
+        return ~self.bool_expression.is_true_batch(assignments)
+
     def get_children(self) -> Sequence[Expression]:
         return [self.bool_expression]
 
@@ -196,6 +275,8 @@ class Or(BooleanExpression):
     have an arbitrary number of child expressions.
     """
 
+    __slots__ = ('bool_expressions',)
+
     def __init__(self, bool_expressions: Sequence[BooleanExpression]):
         self.bool_expressions = bool_expressions
 
@@ -205,6 +286,12 @@ class Or(BooleanExpression):
                 return True
         return False  # no child expression evaluates to True
 
+    def is_true_batch(self, assignments: np.ndarray) -> np.ndarray:
+        result = np.zeros(len(assignments), dtype=bool)
+        for bool_expression in self.bool_expressions:
+            result |= bool_expression.is_true_batch(assignments)
+        return result
+
     def get_children(self) -> Sequence[Expression]:
         return self.bool_expressions
 
@@ -216,6 +303,8 @@ class Xor(BooleanExpression):
     values. Has exactly two child expressions.
     """
 
+    __slots__ = ('bool_expression1', 'bool_expression2')
+
     def __init__(self, bool_expression1: BooleanExpression, bool_expression2: BooleanExpression):
         self.bool_expression1 = bool_expression1
         self.bool_expression2 = bool_expression2
@@ -223,6 +312,10 @@ class Xor(BooleanExpression):
     def is_true(self) -> bool:
         return self.bool_expression1.is_true() != self.bool_expression2.is_true()
 
+    def is_true_batch(self, assignments: np.ndarray) -> np.ndarray:
+        return (self.bool_expression1.is_true_batch(assignments) !=
+                self.bool_expression2.is_true_batch(assignments))
+
     def get_children(self) -> Sequence[Expression]:
         return [self.bool_expression1, self.bool_expression2]
 
@@ -233,6 +326,8 @@ class ArithmeticExpression(Expression, metaclass=ABCMeta):
     Evaluates to a numeric value.
     """
 
+    __slots__ = ()
+
     @abstractmethod
     def get_value(self) -> float:
         """Evaluate arithmetic expression
@@ -254,6 +349,34 @@ class ArithmeticExpression(Expression, metaclass=ABCMeta):
 
         raise NotImplementedError('Abstract method.')
 
+    def get_value_batch(self, assignments: np.ndarray) -> np.ndarray:
+        """Evaluate arithmetic expression for multiple assignments
+
+        Vectorized counterpart of :meth:`get_value`. Evaluates the expression for multiple
+        assignments of values to the decision variables at once. By default, falls back to
+        assigning each row to the involved variables and calling :meth:`get_value`; subclasses
+        should override this method with array operations for efficiency.
+
+        Parameters
+        ----------
+        assignments : np.ndarray
+            Two-dimensional boolean array. Each row is an assignment, each column corresponds to
+            the decision variable with the same index (see :class:`Variable`).
+
+        Returns
+        -------
+        np.ndarray
+            One-dimensional numeric array with the value of the expression for each assignment.
+        """
+
+        variables = set(get_involved_variables(self))
+        result = np.zeros(len(assignments))
+        for i, assignment in enumerate(assignments):
+            for variable in variables:
+                variable.value = bool(assignment[variable.index])
+            result[i] = self.get_value()
+        return result
+
 
 class NumericValue(ArithmeticExpression):
     """Numeric value
@@ -262,12 +385,17 @@ class NumericValue(ArithmeticExpression):
     have child expressions.
     """
 
+    __slots__ = ('value',)
+
     def __init__(self, value: float):
         self.value = value
 
     def get_value(self) -> float:
         return self.value
 
+    def get_value_batch(self, assignments: np.ndarray) -> np.ndarray:
+        return np.full(len(assignments), self.value)
+
 
 class Eq(BooleanExpression):
     """Equality (==) of numeric values
@@ -276,6 +404,8 @@ class Eq(BooleanExpression):
     numeric value. Has exactly two child expressions.
     """
 
+    __slots__ = ('arith_expression1', 'arith_expression2')
+
     def __init__(self, arith_expression1: ArithmeticExpression,
                  arith_expression2: ArithmeticExpression):
         self.arith_expression1 = arith_expression1
@@ -284,6 +414,10 @@ class Eq(BooleanExpression):
     def is_true(self) -> bool:
         return self.arith_expression1.get_value() == self.arith_expression2.get_value()
 
+    def is_true_batch(self, assignments: np.ndarray) -> np.ndarray:
+        return (self.arith_expression1.get_value_batch(assignments) ==
+                self.arith_expression2.get_value_batch(assignments))
+
     def get_children(self) -> Sequence[Expression]:
         return [self.arith_expression1, self.arith_expression2]
 
@@ -295,6 +429,8 @@ class Ge(BooleanExpression):
     or a greater numeric value than the second. Has exactly two child expressions.
     """
 
+    __slots__ = ('arith_expression1', 'arith_expression2')
+
     def __init__(self, arith_expression1: ArithmeticExpression,
                  arith_expression2: ArithmeticExpression):
         self.arith_expression1 = arith_expression1
@@ -303,6 +439,10 @@ class Ge(BooleanExpression):
     def is_true(self) -> bool:
         return self.arith_expression1.get_value() >= self.arith_expression2.get_value()
 
+    def is_true_batch(self, assignments: np.ndarray) -> np.ndarray:
+        return (self.arith_expression1.get_value_batch(assignments) >=
+                self.arith_expression2.get_value_batch(assignments))
+
     def get_children(self) -> Sequence[Expression]:
         return [self.arith_expression1, self.arith_expression2]
 
@@ -314,6 +454,8 @@ class Le(BooleanExpression):
     or a smaller numeric value than the second. Has exactly two child expressions.
     """
 
+    __slots__ = ('arith_expression1', 'arith_expression2')
+
     def __init__(self, arith_expression1: ArithmeticExpression,
                  arith_expression2: ArithmeticExpression):
         self.arith_expression1 = arith_expression1
@@ -322,6 +464,10 @@ class Le(BooleanExpression):
     def is_true(self) -> bool:
         return self.arith_expression1.get_value() <= self.arith_expression2.get_value()
 
+    def is_true_batch(self, assignments: np.ndarray) -> np.ndarray:
+        return (self.arith_expression1.get_value_batch(assignments) <=
+                self.arith_expression2.get_value_batch(assignments))
+
     def get_children(self) -> Sequence[Expression]:
         return [self.arith_expression1, self.arith_expression2]
 
@@ -335,6 +481,8 @@ class Sum(ArithmeticExpression):
     actual numeric values.
     """
 
+    __slots__ = ('bool_expressions',)
+
     def __init__(self, bool_expressions: Sequence[BooleanExpression]):
         self.bool_expressions = bool_expressions
 
@@ -345,6 +493,13 @@ class Sum(ArithmeticExpression):
                 result += 1
         return result
 
+    def get_value_batch(self, assignments: np.ndarray) -> np.ndarray:
+        # Smallest integer type that can hold the maximum sum saves memory bandwidth
+        result = np.zeros(len(assignments), dtype=np.min_scalar_type(len(self.bool_expressions)))
+        for bool_expression in self.bool_expressions:
+            result += bool_expression.is_true_batch(assignments)
+        return result
+
     def get_children(self) -> Sequence[Expression]:
         return self.bool_expressions
 
@@ -358,6 +513,8 @@ class WeightedSum(ArithmeticExpression):
     expressions, since the constraints we analyzed did not require summing actual numeric values.
     """
 
+    __slots__ = ('bool_expressions', 'weights')
+
     def __init__(self, bool_expressions: Sequence[BooleanExpression], weights: Sequence[float]):
         assert len(bool_expressions) == len(weights)
         self.bool_expressions = bool_expressions
@@ -370,10 +527,295 @@ class WeightedSum(ArithmeticExpression):
                 result += weight
         return result
 
+    def get_value_batch(self, assignments: np.ndarray) -> np.ndarray:
+        # Add weights in same order as in scalar evaluation, so (floating-point) results coincide
+        result = np.zeros(len(assignments))
+        for (bool_expression, weight) in zip(self.bool_expressions, self.weights):
+            result = result + np.where(bool_expression.is_true_batch(assignments), weight, 0)
+        return result
+
     def get_children(self) -> Sequence[Expression]:
         return self.bool_expressions
 
 
+class CompiledExpression(BooleanExpression):
+    """Compiled boolean expression
+
+    Wraps a boolean expression and compiles its tree into a single, flat Python function for
+    vectorized evaluation (:meth:`is_true_batch`). The tree is traversed once during
+    initialization; the generated function assigns the result of each node to a local variable
+    and reads the columns of decision variables directly, so evaluation does not need to dispatch
+    method calls along the tree anymore. Nodes whose type is unknown to the compiler (or whose
+    type overrides the vectorized evaluation of a known type) are evaluated by calling their
+    :meth:`is_true_batch` or :meth:`get_value_batch`. Scalar evaluation (:meth:`is_true`) is
+    delegated to the wrapped expression. Has exactly one child expression, i.e., the wrapped one.
+    """
+
+    __slots__ = ('bool_expression', 'constants', 'statements', 'variable_names',
+                 'expression_names', 'source', 'compiled_func')
+
+    def __init__(self, bool_expression: BooleanExpression):
+        self.bool_expression = bool_expression
+        self.constants = {'np': np}  # namespace of the generated function
+        self.statements = []
+        self.variable_names = {}  # map variable indices to names of local variables in function
+        self.expression_names = {}  # map ids of translated nodes to names (shared sub-trees)
+        result_name = self.translate(bool_expression)
+        lines = ['def is_true_batch(assignments):']
+        lines.extend(f'    {name} = assignments[:, {index}]'
+                     for index, name in self.variable_names.items())
+        lines.extend(f'    {statement}' for statement in self.statements)
+        lines.append(f'    return {result_name}')
+        self.source = '\n'.join(lines)
+        exec(compile(self.source, '<compiled expression>', 'exec'), self.constants)
+        self.compiled_func = self.constants['is_true_batch']
+
+    def add_constant(self, value: object) -> str:
+        """Add constant to namespace of generated function
+
+        Parameters
+        ----------
+        value : object
+            The value, e.g., a number or an expression object.
+
+        Returns
+        -------
+        str
+            The name under which the generated function can access the value.
+        """
+
+        name = f'k{len(self.constants)}'
+        self.constants[name] = value
+        return name
+
+    def add_statement(self, source: str) -> str:
+        """Add statement to generated function
+
+        Parameters
+        ----------
+        source : str
+            Source code of a Python expression, whose value should be stored in a new local
+            variable of the generated function.
+
+        Returns
+        -------
+        str
+            The name of the local variable.
+        """
+
+        name = f't{len(self.statements)}'
+        self.statements.append(f'{name} = {source}')
+        return name
+
+    def translate(self, expression: Expression) -> str:
+        """Translate expression tree into statements of the generated function
+
+        Recursively adds statements for the expression and all its child expressions. Sub-trees
+        shared between multiple parents (same object, e.g., from :class:`ExpressionFactory`) are
+        only translated once.
+
+        Parameters
+        ----------
+        expression : Expression
+            The expression to be translated.
+
+        Returns
+        -------
+        str
+            The name of the local variable or constant holding the value of the expression in the
+            generated function.
+        """
+
+        if id(expression) not in self.expression_names:
+            self.expression_names[id(expression)] = self.translate_node(expression)
+        return self.expression_names[id(expression)]
+
+    def translate_node(self, expression: Expression) -> str:
+        """Translate expression into statements of the generated function
+
+        Sub-routine of :meth:`translate`, which should be called instead (also for child
+        expressions) to benefit from caching.
+
+        Parameters
+        ----------
+        expression : Expression
+            The expression to be translated.
+
+        Returns
+        -------
+        str
+            The name of the local variable or constant holding the value of the expression in the
+            generated function.
+        """
+
+        def is_default(expression_type: type) -> bool:
+            return has_default_evaluation(expression, expression_type)
+
+        if is_default(Variable) and (expression.index is not None):
+            if expression.index not in self.variable_names:
+                self.variable_names[expression.index] = f'x{expression.index}'
+            return self.variable_names[expression.index]
+        if is_default(BooleanValue) and not isinstance(expression, Variable):
+            return self.add_statement(f'np.full(len(assignments), {bool(expression.value)})')
+        if is_default(NumericValue):
+            return self.add_constant(expression.value)
+        if is_default(And) or is_default(Or):
+            operator = ' & ' if isinstance(expression, And) else ' | '
+            if len(expression.bool_expressions) == 0:
+                return self.add_statement(
+                    f'np.full(len(assignments), {isinstance(expression, And)})')
+            if len(expression.bool_expressions) == 1:  # make sure result is not a variable's view
+                return self.add_statement(
+                    f'{self.translate(expression.bool_expressions[0])}.copy()')
+            return self.add_statement(operator.join(
+                self.translate(x) for x in expression.bool_expressions))
+        if is_default(Iff):
+            names = [self.translate(x) for x in expression.bool_expressions]
+            if len(names) == 1:
+                return self.add_statement('np.ones(len(assignments), dtype=bool)')
+            return self.add_statement(' & '.join(f'({names[0]} == {name})' for name in names[1:]))
+        if is_default(Implies):
+            return self.add_statement(f'~{self.translate(expression.bool_expression1)} | ' +
+                                      self.translate(expression.bool_expression2))
+        if is_default(Not):
+            return self.add_statement(f'~{self.translate(expression.bool_expression)}')
+        if is_default(Xor):
+            return self.add_statement(f'{self.translate(expression.bool_expression1)} ^ ' +
+                                      self.translate(expression.bool_expression2))
+        for expression_type, operator in [(Eq, '=='), (Ge, '>='), (Le, '<=')]:
+            if is_default(expression_type):
+                operand1 = self.translate(expression.arith_expression1)
+                operand2 = self.translate(expression.arith_expression2)
+                return self.add_statement(f'{operand1} {operator} {operand2}')
+        if is_default(Sum):
+            dtype = self.add_constant(np.min_scalar_type(len(expression.bool_expressions)))
+            result = self.add_statement(f'np.zeros(len(assignments), dtype={dtype})')
+            for bool_expression in expression.bool_expressions:
+                self.statements.append(f'{result} += {self.translate(bool_expression)}')
+            return result
+        if is_default(WeightedSum):  # same order of addition as in scalar evaluation
+            result = self.add_statement('np.zeros(len(assignments))')
+            for (bool_expression, weight) in zip(expression.bool_expressions, expression.weights):
+                self.statements.append(f'{result} += np.where({self.translate(bool_expression)}, ' +
+                                       f'{self.add_constant(weight)}, 0)')
+            return result
+        # Fallback: call (non-compiled) vectorized evaluation of expression
+        if isinstance(expression, BooleanExpression):
+            return self.add_statement(f'{self.add_constant(expression)}.is_true_batch(assignments)')
+        return self.add_statement(f'{self.add_constant(expression)}.get_value_batch(assignments)')
+
+    def is_true(self) -> bool:
+        return self.bool_expression.is_true()
+
+    def is_true_batch(self, assignments: np.ndarray) -> np.ndarray:
+        return self.compiled_func(assignments)
+
+    def get_children(self) -> Sequence[Expression]:
+        return [self.bool_expression]
+
+
+class ExpressionFactory:
+    """Factory for shared expressions (hash-consing)
+
+    Creates expressions of arbitrary (sub-)types, e.g., also from :mod:`combi_expressions`, but
+    returns the previously created object if an expression of the same type with the same
+    arguments was requested before. Child expressions are compared by identity, so expressions
+    created with the factory (bottom-up) are shared if they are structurally equal. Other
+    arguments (e.g., numbers or sequences thereof) are compared by type and value. Saves memory and
+    the construction cost of expressions (including Z3 expressions) created repeatedly, e.g., by
+    constraint generators. Using the factory is optional; expressions are never modified after
+    initialization (except the values of variables), so sharing them between multiple parents or
+    problems is safe.
+    """
+
+    def __init__(self):
+        self.expressions = {}  # map keys to expressions and arguments (keeping children alive)
+
+    def create(self, expression_type: type, *args: object) -> Expression:
+        """Create expression or return shared one
+
+        Parameters
+        ----------
+        expression_type : type
+            The class of the expression, e.g., :class:`And`.
+        *args : object
+            Positional arguments for the initializer of the class.
+
+        Returns
+        -------
+        Expression
+            An expression of the requested type with the requested arguments; the same object for
+            repeated calls with equal type and arguments.
+        """
+
+        key = (expression_type, self.get_key(args))
+        if key not in self.expressions:
+            self.expressions[key] = (expression_type(*args), args)
+        return self.expressions[key][0]
+
+    def get_key(self, value: object) -> object:
+        """Get hashable key of argument
+
+        Parameters
+        ----------
+        value : object
+            An argument for the initializer of an expression.
+
+        Returns
+        -------
+        object
+            The identity of expressions, the (recursive) keys of the elements of lists and tuples,
+            or the type and value of other (hashable) objects.
+        """
+
+        if isinstance(value, Expression):
+            return id(value)
+        if isinstance(value, (list, tuple)):
+            return tuple(self.get_key(x) for x in value)
+        return (type(value), value)
+
+    def clear(self) -> None:
+        """Clear cache
+
+        Expressions created afterwards are not shared with previously created ones.
+        """
+
+        self.expressions.clear()
+
+    def __len__(self) -> int:
+        return len(self.expressions)
+
+
+def has_default_evaluation(expression: Expression, expression_type: type) -> bool:
+    """Check whether expression is evaluated like a given type
+
+    Functions that translate expressions into other representations (e.g., for compilation or
+    counting) use the semantics of known expression types. This function allows them to also
+    handle subclasses of these types, unless the subclasses override the evaluation.
+
+    Parameters
+    ----------
+    expression : Expression
+        The expression to be checked.
+    expression_type : type
+        An expression class.
+
+    Returns
+    -------
+    bool
+        True if the expression is an instance of the class and its class does not override the
+        (scalar and vectorized) evaluation methods of the class, else False.
+    """
+
+    if not isinstance(expression, expression_type):
+        return False
+    if issubclass(expression_type, BooleanExpression):
+        method_names = ['is_true', 'is_true_batch']
+    else:
+        method_names = ['get_value', 'get_value_batch']
+    return all(getattr(type(expression), x) is getattr(expression_type, x) for x in method_names)
+
+
 def get_involved_variables(expression: Expression) -> Sequence[Variable]:
     """Get variables involved in expression
 
@@ -400,3 +842,158 @@ def get_involved_variables(expression: Expression) -> Sequence[Variable]:
     for child_expression in expression.get_children():
         result.extend(get_involved_variables(child_expression))
     return result
+
+
+class LinearConstraint(NamedTuple):
+    """Linear constraint
+
+    Represents the constraint "lower <= w_1 * x_1 + ... + w_n * x_n <= upper", where the weights
+    "w" are numeric constants and the variables "x" are decision variables (0 = false, 1 = true).
+    """
+
+    weights: Dict[int, float]  # map variable indices to weights
+    lower: float
+    upper: float
+
+
+def get_linear_terms(bool_expressions: Sequence[BooleanExpression],
+                     weights: Sequence[float]) -> Optional[Tuple[Dict[int, float], float]]:
+    """Get linear terms of a weighted sum of literals
+
+    Parameters
+    ----------
+    bool_expressions : Sequence[BooleanExpression]
+        Summands, which may be variables (with indices), negated variables, and boolean values.
+    weights : Sequence[float]
+        One weight for each summand.
+
+    Returns
+    -------
+    Optional[Tuple[Dict[int, float], float]]
+        The weighted sum expressed as weights of the variable indices (weights of repeated
+        variables are merged) plus a constant offset, or None if not all summands are literals.
+    """
+
+    terms = {}
+    offset = 0
+    for bool_expression, weight in zip(bool_expressions, weights):
+        if has_default_evaluation(bool_expression, Variable) and\
+                (bool_expression.index is not None):
+            terms[bool_expression.index] = terms.get(bool_expression.index, 0) + weight
+        elif has_default_evaluation(bool_expression, Not) and\
+                has_default_evaluation(bool_expression.bool_expression, Variable) and\
+                (bool_expression.bool_expression.index is not None):  # "w * (1 - x)"
+            index = bool_expression.bool_expression.index
+            terms[index] = terms.get(index, 0) - weight
+            offset += weight
+        elif has_default_evaluation(bool_expression, BooleanValue) and\
+                not isinstance(bool_expression, Variable):
+            offset += weight if bool_expression.is_true() else 0
+        else:
+            return None
+    return terms, offset
+
+
+def get_linear_constraints(expression: BooleanExpression) -> Optional[List[LinearConstraint]]:
+    """Get linear representation of boolean expression
+
+    Expresses the boolean expression as conjunction of linear constraints over the decision
+    variables, if the expression has a known type and its operands are literals (variables or
+    negated variables). For example, "AND", "Group-AT-MOST", "Group-AT-LEAST", "IFF", "NAND",
+    "XOR", and pseudo-boolean constraints can be represented.
+
+    Parameters
+    ----------
+    expression : BooleanExpression
+        The expression to be represented. Its variables need indices.
+
+    Returns
+    -------
+    Optional[List[LinearConstraint]]
+        The linear constraints, which are combined by AND, or None if the expression cannot be
+        represented.
+    """
+
+    def make_constraint(bool_expressions: Sequence[BooleanExpression], weights: Sequence[float],
+                        lower: float, upper: float) -> Optional[List[LinearConstraint]]:
+        linear_terms = get_linear_terms(bool_expressions, weights)
+        if linear_terms is None:
+            return None
+        terms, offset = linear_terms
+        return [LinearConstraint(weights=terms, lower=lower - offset, upper=upper - offset)]
+
+    if has_default_evaluation(expression, And):
+        result = []
+        for bool_expression in expression.bool_expressions:
+            child_result = get_linear_constraints(bool_expression)
+            if child_result is None:
+                return None
+            result.extend(child_result)
+        return result
+    if has_default_evaluation(expression, Variable) or\
+            has_default_evaluation(expression, BooleanValue):
+        return make_constraint([expression], [1], 1, math.inf)
+    if has_default_evaluation(expression, Or):
+        return make_constraint(expression.bool_expressions, [1] * len(expression.bool_expressions),
+                               1, math.inf)
+    if has_default_evaluation(expression, Implies):
+        return make_constraint([expression.bool_expression1, expression.bool_expression2],
+                               [-1, 1], 0, math.inf)
+    if has_default_evaluation(expression, Xor):
+        return make_constraint([expression.bool_expression1, expression.bool_expression2],
+                               [1, 1], 1, 1)
+    if has_default_evaluation(expression, Iff):  # first operand equals each other operand
+        result = []
+        for bool_expression in expression.bool_expressions[1:]:
+            child_result = make_constraint([expression.bool_expressions[0], bool_expression],
+                                           [1, -1], 0, 0)
+            if child_result is None:
+                return None
+            result.extend(child_result)
+        return result
+    if has_default_evaluation(expression, Not):
+        operand = expression.bool_expression
+        if has_default_evaluation(operand, Not):
+            return get_linear_constraints(operand.bool_expression)
+        if has_default_evaluation(operand, And):  # at least one operand false
+            return make_constraint(operand.bool_expressions, [1] * len(operand.bool_expressions),
+                                   -math.inf, len(operand.bool_expressions) - 1)
+        if has_default_evaluation(operand, Or):  # all operands false
+            return make_constraint(operand.bool_expressions, [1] * len(operand.bool_expressions),
+                                   -math.inf, 0)
+        if has_default_evaluation(operand, Variable) or\
+                has_default_evaluation(operand, BooleanValue):
+            return make_constraint([operand], [1], -math.inf, 0)
+        operand_result = get_linear_constraints(operand)
+        # Negate a one-sided inequality with integer weights, e.g., "NOT (sum <= u)" becomes
+        # "sum >= floor(u) + 1" (other negations would require a disjunction):
+        if (operand_result is None) or (len(operand_result) != 1) or\
+                any(w != int(w) for w in operand_result[0].weights.values()):
+            return None
+        weights, lower, upper = operand_result[0]
+        if lower == -math.inf:
+            return [LinearConstraint(weights=weights, lower=math.floor(upper) + 1, upper=math.inf)]
+        if upper == math.inf:
+            return [LinearConstraint(weights=weights, lower=-math.inf, upper=math.ceil(lower) - 1)]
+        return None
+    for expression_type in (Eq, Ge, Le):
+        if has_default_evaluation(expression, expression_type):
+            arith1, arith2 = expression.arith_expression1, expression.arith_expression2
+            if has_default_evaluation(arith1, NumericValue):  # move constant to the right
+                arith1, arith2 = arith2, arith1
+                expression_type = {Eq: Eq, Ge: Le, Le: Ge}[expression_type]
+            if not has_default_evaluation(arith2, NumericValue):
+                return None
+            if has_default_evaluation(arith1, Sum):
+                bool_expressions = arith1.bool_expressions
+                weights = [1] * len(bool_expressions)
+            elif has_default_evaluation(arith1, WeightedSum):
+                bool_expressions = arith1.bool_expressions
+                weights = arith1.weights
+            else:
+                return None
+            value = arith2.get_value()
+            lower = -math.inf if expression_type is Le else value
+            upper = math.inf if expression_type is Ge else value
+            return make_constraint(bool_expressions, weights, lower, upper)
+    return None
@@ -9,13 +9,13 @@ Bach et al. (2022): "An Empirical Evaluation of Constrained Feature Selection"
 """
 
 import math
-from typing import Sequence
+from typing import Optional, Sequence
 
 import pandas as pd
 import sklearn.feature_selection
 
 
-def abs_corr(X: pd.DataFrame, y: pd.Series) -> Sequence[float]:
+def abs_corr(X: pd.DataFrame, y: pd.Series, digits: Optional[int] = 2) -> Sequence[float]:
     """Absolute correlation
 
     Computes the absolute value of the Pearson correlation between each feature and the prediction
@@ -32,6 +32,8 @@ def abs_corr(X: pd.DataFrame, y: pd.Series) -> Sequence[float]:
         Dataset (each row is a data object, each column a feature). All values must be numeric.
     y : pd.Series
         Prediction target. Must be numeric and have the same number of entries as `X` has rows.
+    digits : Optional[int], optional
+        Number of decimal digits to round the feature qualities to. If None, do not round.
 
     Returns
     -------
@@ -39,14 +41,16 @@ def abs_corr(X: pd.DataFrame, y: pd.Series) -> Sequence[float]:
         The feature qualities (as many as `X` has columns). Missing values (due to a feature or the
         target being constant) are replaced with zero. To speed up the solver for constrained
         feature selection (Z3 uses a rational-number representation instead of float), we round the
-        feature qualities.
+        feature qualities by default. For a higher precision, consider the option
+        `quality_precision` of :class:`combi_solving.Problem`, which lets Z3 work with integers.
     """
 
-    result = [round(abs(X[feature].corr(y)), 2) for feature in list(X)]
-    return [0 if math.isnan(x) else x for x in result]
+    result = [abs(X[feature].corr(y)) for feature in list(X)]
+    result = [0 if math.isnan(x) else x for x in result]
+    return result if digits is None else [round(x, digits) for x in result]
 
 
-def mut_info(X: pd.DataFrame, y: pd.Series) -> Sequence[float]:
+def mut_info(X: pd.DataFrame, y: pd.Series, digits: Optional[int] = 2) -> Sequence[float]:
     """Mutual information
 
     Computes the mutual information between each feature and the prediction target as a measure of
@@ -62,15 +66,18 @@ def mut_info(X: pd.DataFrame, y: pd.Series) -> Sequence[float]:
         Dataset (each row is a data object, each column a feature). All values must be numeric.
     y : pd.Series
         Prediction target. Must be numeric and have the same number of entries as `X` has rows.
+    digits : Optional[int], optional
+        Number of decimal digits to round the feature qualities to. If None, do not round.
 
     Returns
     -------
     Sequence[float]
         The feature qualities (as many as `X` has columns). To speed up the solver for constrained
         feature selection (Z3 uses a rational-number representation instead of float), we round the
-        feature qualities.
+        feature qualities by default. For a higher precision, consider the option
+        `quality_precision` of :class:`combi_solving.Problem`, which lets Z3 work with integers.
     """
 
     result = sklearn.feature_selection.mutual_info_regression(
         X=X, y=y, discrete_features=False, n_neighbors=3, random_state=25)
-    return [round(x, 2) for x in result]
+    return list(result) if digits is None else [round(x, digits) for x in result]
@@ -0,0 +1,477 @@
+"""Mixed-integer linear programming
+
+Translation of constraints from :mod:`expressions` (and thereby also :mod:`combi_expressions`)
+into a solver-independent linear model over 0/1 variables, which can be exported in the LP file
+format or optimized with the MILP solver "HiGHS" (via :mod:`scipy.optimize`). Used by
+:mod:`combi_solving` as an alternative to Z3.
+
+Literature
+----------
+- Bach et al. (2022): "An Empirical Evaluation of Constrained Feature Selection"
+- Huangfu & Hall (2018): "Parallelizing the dual revised simplex method"
+- Williams (2013): "Model Building in Mathematical Programming"
+"""
+
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import expressions as expr
+
+
+EPSILON = 1e-6  # minimum violation of a comparison with non-integer weights that evaluates false
+
+
+class LinearModel:
+    """Linear model with binary variables
+
+    Represents a conjunction of boolean expressions as linear constraints over 0/1 variables. The
+    first variables are the decision variables of the expressions (identified by their index);
+    further, auxiliary variables represent the truth value of nested sub-expressions
+    (reification), e.g., "y = x_1 AND x_2" becomes "y <= x_1, y <= x_2, y >= x_1 + x_2 - 1".
+    Comparisons involving sums are reified with big-M constraints, where M follows from the
+    minimum and maximum value of the sum. Top-level expressions that are linear anyway (see
+    :func:`expressions.get_linear_constraints`) are added without auxiliary variables.
+    """
+
+    def __init__(self, num_variables: int):
+        """Initialize model
+
+        Parameters
+        ----------
+        num_variables : int
+            Number of decision variables, which have the indices 0 to `num_variables - 1`.
+        """
+
+        self.num_decision_variables = num_variables
+        self.num_variables = num_variables  # including auxiliary variables
+        self.constraints = []  # list of expr.LinearConstraint
+        self.reified = {}  # map ids of expressions to indices of variables representing them
+        self.expressions = []  # keep reified expressions alive, so their ids stay unique
+        self.status = None  # result of last optimization: "optimal", "infeasible", or "aborted"
+
+    def add_variable(self) -> int:
+        """Add auxiliary variable
+
+        Returns
+        -------
+        int
+            Index of the new variable.
+        """
+
+        self.num_variables += 1
+        return self.num_variables - 1
+
+    def add_linear(self, weights: Dict[int, float], lower: float, upper: float) -> None:
+        """Add linear constraint
+
+        Parameters
+        ----------
+        weights : Dict[int, float]
+            Map of variable indices to weights.
+        lower : float
+            Lower bound of the weighted sum (may be -inf).
+        upper : float
+            Upper bound of the weighted sum (may be inf).
+        """
+
+        self.constraints.append(expr.LinearConstraint(weights=weights, lower=lower, upper=upper))
+
+    def add_constraint(self, expression: expr.BooleanExpression) -> None:
+        """Add boolean expression as constraint
+
+        Parameters
+        ----------
+        expression : expr.BooleanExpression
+            The constraint. Its variables need indices.
+
+        Raises
+        ------
+        ValueError
+            If the expression (or one of its sub-expressions) has an unknown type.
+        """
+
+        if isinstance(expression, expr.CompiledExpression):
+            expression = expression.bool_expression
+        if expr.has_default_evaluation(expression, expr.And):
+            for bool_expression in expression.bool_expressions:
+                self.add_constraint(bool_expression)
+            return
+        linear_constraints = expr.get_linear_constraints(expression)
+        if linear_constraints is not None:
+            self.constraints.extend(linear_constraints)
+        else:
+            self.add_linear({self.reify(expression): 1}, 1, 1)
+
+    def reify(self, expression: expr.BooleanExpression) -> int:
+        """Get variable representing truth value of expression
+
+        Adds constraints and auxiliary variables for the expression and its sub-expressions (if
+        not done before for the same expression object).
+
+        Parameters
+        ----------
+        expression : expr.BooleanExpression
+            The expression to be represented.
+
+        Raises
+        ------
+        ValueError
+            If the expression (or one of its sub-expressions) has an unknown type.
+
+        Returns
+        -------
+        int
+            Index of a variable that is 1 if and only if the expression is true.
+        """
+
+        if id(expression) not in self.reified:
+            self.reified[id(expression)] = self.reify_node(expression)
+            self.expressions.append(expression)
+        return self.reified[id(expression)]
+
+    def reify_node(self, expression: expr.BooleanExpression) -> int:
+        """Get variable representing truth value of expression
+
+        Sub-routine of :meth:`reify`, which should be called instead (also for child expressions)
+        to benefit from caching.
+
+        Parameters
+        ----------
+        expression : expr.BooleanExpression
+            The expression to be represented.
+
+        Raises
+        ------
+        ValueError
+            If the expression (or one of its sub-expressions) has an unknown type.
+
+        Returns
+        -------
+        int
+            Index of a variable that is 1 if and only if the expression is true.
+        """
+
+        def is_default(expression_type: type) -> bool:
+            return expr.has_default_evaluation(expression, expression_type)
+
+        if isinstance(expression, expr.CompiledExpression):
+            return self.reify(expression.bool_expression)
+        if is_default(expr.Variable) and (expression.index is not None):
+            return expression.index
+        if is_default(expr.BooleanValue) and not isinstance(expression, expr.Variable):
+            return self.reify_constant(expression.is_true())
+        if is_default(expr.Not):
+            result = self.add_variable()
+            self.add_linear({result: 1, self.reify(expression.bool_expression): 1}, 1, 1)
+            return result
+        if is_default(expr.And) or is_default(expr.Or):
+            return self.reify_and_or([self.reify(x) for x in expression.bool_expressions],
+                                     is_and=isinstance(expression, expr.And))
+        if is_default(expr.Implies):  # "NOT x_1 OR x_2", i.e., "y = 1 - (x_1 AND NOT x_2)"
+            variable1 = self.reify(expression.bool_expression1)
+            variable2 = self.reify(expression.bool_expression2)
+            result = self.add_variable()
+            self.add_linear(get_weights([(result, 1), (variable1, 1)]), 1, math.inf)
+            self.add_linear(get_weights([(result, 1), (variable2, -1)]), 0, math.inf)
+            self.add_linear(get_weights([(result, 1), (variable1, 1), (variable2, -1)]),
+                            -math.inf, 1)
+            return result
+        if is_default(expr.Xor):
+            variable1 = self.reify(expression.bool_expression1)
+            variable2 = self.reify(expression.bool_expression2)
+            result = self.add_variable()
+            self.add_linear(get_weights([(result, 1), (variable1, -1), (variable2, -1)]),
+                            -math.inf, 0)
+            self.add_linear(get_weights([(result, 1), (variable1, -1), (variable2, 1)]),
+                            0, math.inf)
+            self.add_linear(get_weights([(result, 1), (variable1, 1), (variable2, -1)]),
+                            0, math.inf)
+            self.add_linear(get_weights([(result, 1), (variable1, 1), (variable2, 1)]),
+                            -math.inf, 2)
+            return result
+        if is_default(expr.Iff):  # "all true OR all false"
+            variables = [self.reify(x) for x in expression.bool_expressions]
+            all_true = self.reify_and_or(variables, is_and=True)
+            any_true = self.reify_and_or(variables, is_and=False)
+            result = self.add_variable()
+            self.add_linear({result: 1, all_true: -1}, 0, math.inf)
+            self.add_linear({result: 1, any_true: 1}, 1, math.inf)
+            self.add_linear({result: 1, all_true: -1, any_true: 1}, -math.inf, 1)
+            return result
+        for expression_type in (expr.Eq, expr.Ge, expr.Le):
+            if is_default(expression_type):
+                weights1, constant1 = self.get_linear_terms(expression.arith_expression1)
+                weights2, constant2 = self.get_linear_terms(expression.arith_expression2)
+                weights = dict(weights1)
+                for variable_idx, weight in weights2.items():
+                    weights[variable_idx] = weights.get(variable_idx, 0) - weight
+                bound = constant2 - constant1  # comparison between weighted sum and bound
+                if expression_type is expr.Le:
+                    return self.reify_at_most(weights, bound)
+                negated_weights = {i: -w for i, w in weights.items()}
+                if expression_type is expr.Ge:
+                    return self.reify_at_most(negated_weights, -bound)
+                return self.reify_and_or([self.reify_at_most(weights, bound),
+                                          self.reify_at_most(negated_weights, -bound)],
+                                         is_and=True)
+        raise ValueError(f'Expression type "{type(expression).__name__}" cannot be linearized.')
+
+    def reify_constant(self, value: bool) -> int:
+        """Get variable with a constant value
+
+        Parameters
+        ----------
+        value : bool
+            The value.
+
+        Returns
+        -------
+        int
+            Index of a variable fixed to the value.
+        """
+
+        key = ('constant', value)  # no expression id, as ids are integers
+        if key not in self.reified:
+            self.reified[key] = self.add_variable()
+            self.add_linear({self.reified[key]: 1}, int(value), int(value))
+        return self.reified[key]
+
+    def reify_and_or(self, variable_indices: Sequence[int], is_and: bool) -> int:
+        """Get variable representing AND or OR of variables
+
+        Parameters
+        ----------
+        variable_indices : Sequence[int]
+            Indices of the operand variables.
+        is_and : bool
+            True for AND, False for OR.
+
+        Returns
+        -------
+        int
+            Index of a variable that is 1 if and only if the operator evaluates to true.
+        """
+
+        if len(variable_indices) == 0:
+            return self.reify_constant(is_and)
+        result = self.add_variable()
+        num_operands = len(variable_indices)
+        for variable_idx in variable_indices:  # AND: "y <= x_i"; OR: "y >= x_i"
+            self.add_linear({result: 1, variable_idx: -1}, *((-math.inf, 0) if is_and else
+                                                             (0, math.inf)))
+        weights = get_weights([(result, 1)] + [(x, -1) for x in variable_indices])
+        if is_and:  # "y >= sum(x_i) - (n - 1)"
+            self.add_linear(weights, 1 - num_operands, math.inf)
+        else:  # "y <= sum(x_i)"
+            self.add_linear(weights, -math.inf, 0)
+        return result
+
+    def reify_at_most(self, weights: Dict[int, float], bound: float) -> int:
+        """Get variable representing upper bound on weighted sum
+
+        Parameters
+        ----------
+        weights : Dict[int, float]
+            Map of variable indices to weights.
+        bound : float
+            The upper bound.
+
+        Returns
+        -------
+        int
+            Index of a variable that is 1 if and only if the weighted sum does not exceed the
+            bound.
+        """
+
+        min_sum = sum(min(w, 0) for w in weights.values())
+        max_sum = sum(max(w, 0) for w in weights.values())
+        if max_sum <= bound:
+            return self.reify_constant(True)
+        if min_sum > bound:
+            return self.reify_constant(False)
+        # Smallest sum that violates the bound:
+        if all(float(w).is_integer() for w in weights.values()):
+            violation = math.floor(bound) + 1
+        else:
+            violation = bound + EPSILON
+        result = self.add_variable()
+        # "y = 1" implies "sum <= bound"; "y = 0" implies "sum >= violation":
+        self.add_linear({**weights, result: max_sum - bound}, -math.inf, max_sum)
+        self.add_linear({**weights, result: violation - min_sum}, violation, math.inf)
+        return result
+
+    def get_linear_terms(self, expression: expr.ArithmeticExpression) -> Tuple[Dict[int, float],
+                                                                               float]:
+        """Get linear representation of arithmetic expression
+
+        Parameters
+        ----------
+        expression : expr.ArithmeticExpression
+            The expression to be represented.
+
+        Raises
+        ------
+        ValueError
+            If the expression (or one of its sub-expressions) has an unknown type.
+
+        Returns
+        -------
+        Tuple[Dict[int, float], float]
+            Map of variable indices to weights as well as a constant, whose sum represents the
+            value of the expression.
+        """
+
+        if expr.has_default_evaluation(expression, expr.NumericValue):
+            return {}, expression.get_value()
+        if expr.has_default_evaluation(expression, expr.WeightedSum):
+            weights = expression.weights
+        elif expr.has_default_evaluation(expression, expr.Sum):
+            weights = [1] * len(expression.bool_expressions)
+        else:
+            raise ValueError(f'Expression type "{type(expression).__name__}" cannot be ' +
+                             'linearized.')
+        result = {}
+        for bool_expression, weight in zip(expression.bool_expressions, weights):
+            variable_idx = self.reify(bool_expression)
+            result[variable_idx] = result.get(variable_idx, 0) + weight
+        return result, 0
+
+    def optimize(self, qualities: Sequence[float],
+                 time_limit: Optional[float] = None) -> Optional[List[int]]:
+        """Find optimal solution with HiGHS
+
+        Maximizes the weighted sum of the decision variables under the constraints. Requires
+        :func:`scipy.optimize.milp`, i.e., scipy >= 1.9. Sets :attr:`status` to "optimal" if an
+        optimal solution was found, "infeasible" if the constraints cannot be satisfied, or
+        "aborted" otherwise (e.g., if the time limit was reached).
+
+        Parameters
+        ----------
+        qualities : Sequence[float]
+            Weights of the decision variables in the objective.
+        time_limit : Optional[float], optional
+            Maximum runtime of the solver in seconds. If None, run until optimality is proven.
+
+        Raises
+        ------
+        ImportError
+            If scipy does not provide a MILP solver.
+
+        Returns
+        -------
+        Optional[List[int]]
+            The indices of the decision variables that are true in the best solution found, or
+            None if no solution was found.
+        """
+
+        try:
+            from scipy.optimize import milp, Bounds
+            from scipy.optimize import LinearConstraint as ScipyLinearConstraint
+            import scipy.sparse
+        except ImportError as error:
+            raise ImportError('The MILP backend requires scipy >= 1.9 (optional dependency ' +
+                              '"milp").') from error
+        objective = np.zeros(self.num_variables)
+        objective[:len(qualities)] = -np.asarray(qualities, dtype=float)  # milp() minimizes
+        rows, columns, values = [], [], []
+        for row, constraint in enumerate(self.constraints):
+            for variable_idx, weight in constraint.weights.items():
+                rows.append(row)
+                columns.append(variable_idx)
+                values.append(weight)
+        constraints = None
+        if len(self.constraints) > 0:
+            matrix = scipy.sparse.csr_matrix((values, (rows, columns)),
+                                             shape=(len(self.constraints), self.num_variables))
+            constraints = ScipyLinearConstraint(matrix, [x.lower for x in self.constraints],
+                                                [x.upper for x in self.constraints])
+        options = {'mip_rel_gap': 0}
+        if time_limit is not None:
+            options['time_limit'] = time_limit
+        result = milp(c=objective, integrality=np.ones(self.num_variables),
+                      bounds=Bounds(0, 1), constraints=constraints, options=options)
+        if result.status == 0:
+            self.status = 'optimal'
+        elif result.status == 2:
+            self.status = 'infeasible'
+        else:
+            self.status = 'aborted'
+        if result.x is None:
+            return None
+        return [i for i in range(self.num_decision_variables) if result.x[i] > 0.5]
+
+    def to_lp_format(self, qualities: Sequence[float]) -> str:
+        """Export model in LP file format
+
+        The LP file format is understood by most MILP solvers (e.g., CPLEX, Gurobi, HiGHS, CBC).
+        Variable "x<i>" has index i.
+
+        Parameters
+        ----------
+        qualities : Sequence[float]
+            Weights of the decision variables in the (maximized) objective.
+
+        Returns
+        -------
+        str
+            The model as a string in LP file format.
+        """
+
+        def format_terms(weights: Dict[int, float]) -> str:
+            terms = ' '.join(f'{"-" if w < 0 else "+"} {abs(w)!r} x{i}'
+                             for i, w in weights.items() if w != 0)
+            return terms if len(terms) > 0 else '0 x0'
+
+        lines = ['Maximize', ' obj: ' + format_terms(dict(enumerate(qualities))), 'Subject To']
+        for row, constraint in enumerate(self.constraints):
+            terms = format_terms(constraint.weights)
+            if constraint.lower == constraint.upper:
+                lines.append(f' c{row}: {terms} = {constraint.lower!r}')
+                continue
+            if constraint.lower > -math.inf:
+                lines.append(f' c{row}_lower: {terms} >= {constraint.lower!r}')
+            if constraint.upper < math.inf:
+                lines.append(f' c{row}_upper: {terms} <= {constraint.upper!r}')
+        lines.append('Binary')
+        lines.extend(f' x{i}' for i in range(self.num_variables))
+        lines.append('End')
+        return '\n'.join(lines)
+
+
+def get_weights(terms: Sequence[Tuple[int, float]]) -> Dict[int, float]:
+    """Combine terms of linear constraint
+
+    Parameters
+    ----------
+    terms : Sequence[Tuple[int, float]]
+        Pairs of variable index and weight, where variables might repeat.
+
+    Returns
+    -------
+    Dict[int, float]
+        Map of variable indices to summed weights.
+    """
+
+    weights = {}
+    for variable_idx, weight in terms:
+        weights[variable_idx] = weights.get(variable_idx, 0) + weight
+    return weights
+
+
+def is_solver_available() -> bool:
+    """Check availability of MILP solver
+
+    The MILP solver (see :meth:`LinearModel.optimize`) is an optional dependency, as it requires
+    scipy >= 1.9 (installable as extra "milp" of this package), while building models and
+    exporting them (see :meth:`LinearModel.to_lp_format`) also works with older versions.
+
+    Returns
+    -------
+    bool
+        True if :func:`scipy.optimize.milp` exists.
+    """
+
+    import scipy.optimize
+    return hasattr(scipy.optimize, 'milp')
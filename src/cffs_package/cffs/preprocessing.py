@@ -0,0 +1,485 @@
+"""Preprocessing of constraints
+
+Functions to simplify constraints from :mod:`combi_expressions` before they are passed to a solver
+or counter (see :mod:`combi_solving`): flattening and deduplicating the operands of n-ary
+operators, folding boolean values (constants), propagating variables whose values are forced by
+the constraints (unit propagation), and fixing variables that cannot affect the optimum.
+
+Literature
+----------
+- Biere et al. (2021): "Handbook of Satisfiability" (chapter "Preprocessing in SAT Solving")
+- Een & Biere (2005): "Effective Preprocessing in SAT Through Variable and Clause Elimination"
+"""
+
+import numbers
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from . import combi_expressions as expr
+
+
+class PreprocessingResult(NamedTuple):
+    """Result of preprocessing
+
+    Represents a problem equivalent to the original one if the variables with fixed values are
+    set accordingly. If the constraints are unsatisfiable, the other fields are meaningless.
+    """
+
+    constraints: List[expr.BooleanExpression]  # simplified, not involving fixed variables
+    fixed_values: Dict[int, bool]  # map variable indices to values
+    is_feasible: bool
+
+
+def preprocess(constraints: Sequence[expr.BooleanExpression],
+               qualities: Optional[Sequence[float]] = None) -> PreprocessingResult:
+    """Preprocess constraints
+
+    Simplifies the constraints (see :func:`simplify`) and splits conjunctions into separate
+    constraints. Constraints that are literals (variables or negated variables), e.g., also
+    resulting from cardinality constraints like "AT-MOST 0", fix the value of their variable,
+    which is substituted into the other constraints, repeating until no further variable is fixed
+    (unit propagation). The number of solutions of the original constraints equals the number of
+    solutions of the returned constraints over the variables that are not fixed.
+
+    If qualities are provided, also fixes the variables not involved in any remaining constraint
+    to their optimal value (true if their quality is positive, else false), i.e., the result is
+    only equivalent to the original constraints regarding optimization with these qualities.
+
+    Parameters
+    ----------
+    constraints : Sequence[expr.BooleanExpression]
+        Constraints (combined by AND) whose variables have indices.
+    qualities : Optional[Sequence[float]], optional
+        Weights of the decision variables in the (maximized) objective.
+
+    Returns
+    -------
+    PreprocessingResult
+        The simplified constraints, the values of fixed variables, and whether the constraints
+        may be satisfiable (False if simplification proved the opposite).
+    """
+
+    fixed_values = {}
+    remaining_constraints = list(constraints)
+    has_new_values = True
+    while has_new_values:
+        has_new_values = False
+        conjuncts = []
+        for constraint in simplify(remaining_constraints, fixed_values=fixed_values):
+            if isinstance(constraint, expr.And):  # already flattened
+                conjuncts.extend(constraint.bool_expressions)
+            else:
+                conjuncts.append(constraint)
+        remaining_constraints = []
+        conjunct_ids = set()
+        for conjunct in conjuncts:
+            if id(conjunct) in conjunct_ids:
+                continue
+            conjunct_ids.add(id(conjunct))
+            if is_value(conjunct):
+                if not conjunct.value:
+                    return PreprocessingResult(constraints=[], fixed_values=fixed_values,
+                                               is_feasible=False)
+                continue
+            literal = get_literal(conjunct)
+            if literal is None:
+                remaining_constraints.append(conjunct)
+                continue
+            index, value = literal
+            if index not in fixed_values:
+                fixed_values[index] = value
+                has_new_values = True  # substitute into the other constraints in next round
+            elif fixed_values[index] != value:
+                return PreprocessingResult(constraints=[], fixed_values=fixed_values,
+                                           is_feasible=False)
+    if qualities is not None:
+        constrained_indices = get_variable_indices(remaining_constraints)
+        for index, quality in enumerate(qualities):
+            if (index not in constrained_indices) and (index not in fixed_values):
+                fixed_values[index] = quality > 0
+    return PreprocessingResult(constraints=remaining_constraints, fixed_values=fixed_values,
+                               is_feasible=True)
+
+
+def simplify(expressions: Sequence[expr.BooleanExpression],
+             fixed_values: Optional[Dict[int, bool]] = None) -> List[expr.BooleanExpression]:
+    """Simplify expressions
+
+    Replaces variables with fixed values by boolean values and simplifies each node of the
+    expression trees bottom-up (see :func:`simplify_node`), e.g., folds boolean values, flattens
+    nested ANDs/ORs, and removes duplicate operands. The simplified expressions are equivalent to
+    the original ones (given the fixed values). Nodes that do not change are re-used (including
+    their Z3 representation), and nodes shared between expressions are simplified only once.
+
+    Parameters
+    ----------
+    expressions : Sequence[expr.BooleanExpression]
+        Expressions from :mod:`combi_expressions`.
+    fixed_values : Optional[Dict[int, bool]], optional
+        Values of variables (by index) that should be substituted.
+
+    Returns
+    -------
+    List[expr.BooleanExpression]
+        The simplified expressions, in the same order.
+    """
+
+    if fixed_values is None:
+        fixed_values = {}
+    simplified = {}  # map ids of original expressions to simplified expressions
+    for root in expressions:
+        stack = [root]  # iterative post-order traversal, as trees may be deep
+        while len(stack) > 0:
+            expression = stack[-1]
+            if id(expression) in simplified:
+                stack.pop()
+                continue
+            missing_children = [x for x in expr.get_children(expression)
+                                if id(x) not in simplified]
+            if len(missing_children) > 0:
+                stack.extend(missing_children)
+                continue
+            stack.pop()
+            simplified[id(expression)] = simplify_node(
+                expression=expression, children=[simplified[id(x)] for x in
+                                                 expr.get_children(expression)],
+                fixed_values=fixed_values)
+    return [simplified[id(x)] for x in expressions]
+
+
+def simplify_node(expression: expr.BooleanExpression, children: Sequence[expr.BooleanExpression],
+                  fixed_values: Dict[int, bool]) -> expr.BooleanExpression:
+    """Simplify one node of an expression tree
+
+    Sub-routine of :func:`simplify`, applying simplification rules to the expression, given its
+    simplified child expressions. Cardinality constraints are simplified to ANDs of literals if
+    all operands are forced to the same value. Weighted sums only fold boolean values if weights
+    and threshold are integers (so no rounding errors occur).
+
+    Parameters
+    ----------
+    expression : expr.BooleanExpression
+        An expression from :mod:`combi_expressions`.
+    children : Sequence[expr.BooleanExpression]
+        The simplified child expressions of the expression.
+    fixed_values : Dict[int, bool]
+        Values of variables (by index) that should be substituted.
+
+    Raises
+    ------
+    ValueError
+        If the expression type is not from :mod:`combi_expressions`.
+
+    Returns
+    -------
+    expr.BooleanExpression
+        An equivalent expression, which may be the original one.
+    """
+
+    if isinstance(expression, expr.Variable):
+        if expression.index in fixed_values:
+            return expr.BooleanValue(fixed_values[expression.index])
+        return expression
+    if isinstance(expression, expr.BooleanValue):
+        return expression
+    if isinstance(expression, expr.Not):
+        if (children[0] is expression.bool_expression) and not is_value(children[0]) and\
+                not isinstance(children[0], expr.Not):
+            return expression
+        return negate(children[0])
+    if isinstance(expression, (expr.And, expr.Or)):
+        return simplify_junction(expression_type=type(expression), children=children,
+                                 expression=expression)
+    if isinstance(expression, expr.Implies):
+        if is_value(children[0]) or is_value(children[1]) or (children[0] is children[1]):
+            return simplify_junction(expression_type=expr.Or,
+                                     children=[negate(children[0]), children[1]])
+        return rebuild(expression, children, expr.Implies(*children))
+    if isinstance(expression, expr.Xor):
+        for child, other_child in [children, reversed(children)]:
+            if is_value(child):
+                return negate(other_child) if child.value else other_child
+        if children[0] is children[1]:
+            return expr.BooleanValue(False)
+        return rebuild(expression, children, expr.Xor(*children))
+    if isinstance(expression, expr.Iff):
+        values = {x.value for x in children if is_value(x)}
+        operands = deduplicate([x for x in children if not is_value(x)])
+        if len(values) == 2:
+            return expr.BooleanValue(False)
+        if True in values:  # all operands true
+            return simplify_junction(expression_type=expr.And, children=operands)
+        if False in values:  # all operands false
+            return simplify_junction(expression_type=expr.And,
+                                     children=[negate(x) for x in operands])
+        if len(operands) <= 1:
+            return expr.BooleanValue(True)
+        return rebuild(expression, children, expr.Iff(operands))
+    if isinstance(expression, (expr.AtLeast, expr.AtMost)):
+        operands = [x for x in children if not is_value(x)]  # duplicates count repeatedly
+        value = expression.arith_expression2.value - sum(x.value for x in children if is_value(x))
+        if isinstance(expression, expr.AtLeast):
+            if value <= 0:
+                return expr.BooleanValue(True)
+            if value > len(operands):
+                return expr.BooleanValue(False)
+            if value == len(operands):  # all operands true
+                return simplify_junction(expression_type=expr.And, children=operands)
+        else:
+            if value < 0:
+                return expr.BooleanValue(False)
+            if value >= len(operands):
+                return expr.BooleanValue(True)
+            if value == 0:  # all operands false
+                return simplify_junction(expression_type=expr.And,
+                                         children=[negate(x) for x in operands])
+        if (len(operands) == len(children)) and (value == expression.arith_expression2.value):
+            return rebuild(expression, children, type(expression)(children, value))
+        return type(expression)(operands, value)
+    if isinstance(expression, (expr.WeightedSumEq, expr.WeightedSumGe, expr.WeightedSumLe)):
+        return simplify_weighted_sum(expression=expression, children=children)
+    raise ValueError(f'Unknown expression type "{type(expression).__name__}".')
+
+
+def simplify_weighted_sum(expression: expr.BooleanExpression,
+                          children: Sequence[expr.BooleanExpression]) -> expr.BooleanExpression:
+    """Simplify a weighted-sum constraint
+
+    Sub-routine of :func:`simplify_node`. Removes operands that are false. If the weights and the
+    threshold are integers, also removes operands that are true (adapting the threshold) and
+    evaluates the constraint if it holds (or is violated) independent from the operands.
+
+    Parameters
+    ----------
+    expression : expr.BooleanExpression
+        A weighted-sum constraint from :mod:`combi_expressions`.
+    children : Sequence[expr.BooleanExpression]
+        The simplified child expressions of the expression.
+
+    Returns
+    -------
+    expr.BooleanExpression
+        An equivalent expression, which may be the original one.
+    """
+
+    weights = expression.arith_expression1.weights
+    value = expression.arith_expression2.value
+    is_integral = isinstance(value, numbers.Integral) and\
+        all(isinstance(w, numbers.Integral) for w in weights)
+    operands = []
+    operand_weights = []
+    for child, weight in zip(children, weights):
+        if is_value(child) and (not child.value or is_integral):
+            value -= weight if child.value else 0
+        else:
+            operands.append(child)
+            operand_weights.append(weight)
+    if is_integral or (len(operands) == 0):  # no rounding errors (sum of no weights is zero)
+        min_sum = sum(w for w in operand_weights if w < 0)
+        max_sum = sum(w for w in operand_weights if w > 0)
+        if isinstance(expression, expr.WeightedSumEq):
+            if (value < min_sum) or (value > max_sum):
+                return expr.BooleanValue(False)
+            if min_sum == max_sum:  # implies that it equals the value
+                return expr.BooleanValue(True)
+        elif isinstance(expression, expr.WeightedSumGe):
+            if min_sum >= value:
+                return expr.BooleanValue(True)
+            if max_sum < value:
+                return expr.BooleanValue(False)
+        else:
+            if max_sum <= value:
+                return expr.BooleanValue(True)
+            if min_sum > value:
+                return expr.BooleanValue(False)
+    if len(operands) == len(children):
+        return rebuild(expression, children, type(expression)(children, weights, value))
+    return type(expression)(operands, operand_weights, value)
+
+
+def simplify_junction(expression_type: type, children: Sequence[expr.BooleanExpression],
+                      expression: Optional[expr.BooleanExpression] = None
+                      ) -> expr.BooleanExpression:
+    """Simplify an AND or OR
+
+    Sub-routine of :func:`simplify_node`. Flattens nested operators of the same type, removes
+    duplicate operands and neutral boolean values, and evaluates the operator if it contains the
+    absorbing boolean value or an operand as well as its negation. Returns the single operand if
+    only one remains.
+
+    Parameters
+    ----------
+    expression_type : type
+        Either :class:`combi_expressions.And` or :class:`combi_expressions.Or`.
+    children : Sequence[expr.BooleanExpression]
+        The simplified operands.
+    expression : Optional[expr.BooleanExpression], optional
+        The original expression, which is re-used if nothing can be simplified.
+
+    Returns
+    -------
+    expr.BooleanExpression
+        An equivalent expression.
+    """
+
+    absorbing_value = expression_type is expr.Or  # "False" for AND, "True" for OR
+    operands = []
+    for child in children:
+        if isinstance(child, expression_type):  # already flattened
+            operands.extend(child.bool_expressions)
+        elif is_value(child):
+            if child.value == absorbing_value:
+                return expr.BooleanValue(absorbing_value)
+        else:
+            operands.append(child)
+    operands = deduplicate(operands)
+    operand_ids = {id(x) for x in operands}
+    if any(isinstance(x, expr.Not) and (id(x.bool_expression) in operand_ids) for x in operands):
+        return expr.BooleanValue(absorbing_value)
+    if len(operands) == 0:
+        return expr.BooleanValue(not absorbing_value)
+    if len(operands) == 1:
+        return operands[0]
+    if expression is not None:
+        return rebuild(expression, operands, expression_type(operands))
+    return expression_type(operands)
+
+
+def negate(expression: expr.BooleanExpression) -> expr.BooleanExpression:
+    """Negate an expression
+
+    Parameters
+    ----------
+    expression : expr.BooleanExpression
+        A (simplified) expression from :mod:`combi_expressions`.
+
+    Returns
+    -------
+    expr.BooleanExpression
+        The negated expression, without double negation.
+    """
+
+    if is_value(expression):
+        return expr.BooleanValue(not expression.value)
+    if isinstance(expression, expr.Not):
+        return expression.bool_expression
+    return expr.Not(expression)
+
+
+def rebuild(expression: expr.BooleanExpression, children: Sequence[expr.BooleanExpression],
+            new_expression: expr.BooleanExpression) -> expr.BooleanExpression:
+    """Choose between original and re-built expression
+
+    Parameters
+    ----------
+    expression : expr.BooleanExpression
+        The original expression.
+    children : Sequence[expr.BooleanExpression]
+        The child expressions of the re-built expression.
+    new_expression : expr.BooleanExpression
+        The re-built expression.
+
+    Returns
+    -------
+    expr.BooleanExpression
+        The original expression if it has the same child expressions (identical objects, so
+        its Z3 representation can be re-used), else the re-built expression.
+    """
+
+    original_children = expr.get_children(expression)
+    if (len(children) == len(original_children)) and\
+            all(x is y for x, y in zip(children, original_children)):
+        return expression
+    return new_expression
+
+
+def deduplicate(expressions: Sequence[expr.BooleanExpression]) -> List[expr.BooleanExpression]:
+    """Remove duplicate expressions
+
+    Parameters
+    ----------
+    expressions : Sequence[expr.BooleanExpression]
+        Expressions, which may contain the same object multiple times (e.g., shared via
+        :class:`expressions.ExpressionFactory`).
+
+    Returns
+    -------
+    List[expr.BooleanExpression]
+        The expressions in their original order, keeping only the first occurrence of each object.
+    """
+
+    expression_ids = set()
+    result = []
+    for expression in expressions:
+        if id(expression) not in expression_ids:
+            expression_ids.add(id(expression))
+            result.append(expression)
+    return result
+
+
+def is_value(expression: expr.BooleanExpression) -> bool:
+    """Check for boolean value
+
+    Parameters
+    ----------
+    expression : expr.BooleanExpression
+        An expression from :mod:`combi_expressions`.
+
+    Returns
+    -------
+    bool
+        True if the expression is a boolean value (constant), but not a variable (which is a
+        subclass of boolean value).
+    """
+
+    return isinstance(expression, expr.BooleanValue) and not isinstance(expression, expr.Variable)
+
+
+def get_literal(expression: expr.BooleanExpression) -> Optional[Tuple[int, bool]]:
+    """Get literal represented by expression
+
+    Parameters
+    ----------
+    expression : expr.BooleanExpression
+        An expression from :mod:`combi_expressions`.
+
+    Returns
+    -------
+    Optional[Tuple[int, bool]]
+        The index of the variable and the value that makes the expression true if the expression
+        is a variable or negated variable (with index), else None.
+    """
+
+    if isinstance(expression, expr.Variable) and (expression.index is not None):
+        return expression.index, True
+    if isinstance(expression, expr.Not) and isinstance(expression.bool_expression, expr.Variable)\
+            and (expression.bool_expression.index is not None):
+        return expression.bool_expression.index, False
+    return None
+
+
+def get_variable_indices(expressions: Sequence[expr.BooleanExpression]) -> Set[int]:
+    """Get indices of variables involved in expressions
+
+    Parameters
+    ----------
+    expressions : Sequence[expr.BooleanExpression]
+        Expressions from :mod:`combi_expressions`.
+
+    Returns
+    -------
+    Set[int]
+        The indices of all variables (with index) in the expression trees.
+    """
+
+    result = set()
+    visited_ids = set()
+    stack = list(expressions)  # iterative traversal, as trees may be deep
+    while len(stack) > 0:
+        expression = stack.pop()
+        if id(expression) in visited_ids:
+            continue
+        visited_ids.add(id(expression))
+        if isinstance(expression, expr.Variable) and (expression.index is not None):
+            result.add(expression.index)
+        stack.extend(expr.get_children(expression))
+    return result
@@ -10,13 +10,20 @@ Literature
 - Barrett & Tinelli (2018): "Satisfiability Modulo Theories"
 """
 
-import itertools
 import random
-from typing import Sequence
+import time
+from typing import Dict, List, Optional, Sequence
 
+import numpy as np
+
+from . import bdd
+from . import counting
 from . import expressions as expr
 
 
+MAX_INCREMENTAL_VARIABLES = 28  # bitmap of solutions needs 2^n bits (32 MB for 28 variables)
+
+
 class Problem:
     """SMT problem
 
@@ -24,7 +31,7 @@ class Problem:
     count the number of solutions (but not to efficiently find them under an objective).
     """
 
-    def __init__(self, variable_names: Sequence[str]):
+    def __init__(self, variable_names: Sequence[str], incremental_counting: bool = False):
         """Initialize problem
 
         Creates an unconstrained SMT problem and internally stores one binary decision variable for
@@ -34,10 +41,29 @@ class Problem:
         ----------
         variable_names : Sequence[str]
             Desired names of the decision variables.
+        incremental_counting : bool, optional
+            If True, maintain the set of solutions while adding constraints (see
+            :class:`counting.SolutionBitmap`), so the solution fraction is available after each
+            constraint. Memory consumption is 2^n bits, so the number of variables is limited.
+
+        Raises
+        ------
+        ValueError
+            If incremental counting is requested for too many variables.
         """
 
-        self.variables = [expr.Variable(name=x) for x in variable_names]
+        self.variables = [expr.Variable(name=x, index=i) for i, x in enumerate(variable_names)]
         self.constraints = []  # several constraints allowed, will be combined by AND
+        self.compiled_constraints = []  # compiled lazily, for vectorized evaluation
+        self.solution_bitmap = None
+        self.solution_counts = []  # number of solutions after adding each constraint
+        self.metrics = {}  # measurements since constraints were cleared last (see get_metrics())
+        if incremental_counting:
+            if len(self.variables) > MAX_INCREMENTAL_VARIABLES:
+                raise ValueError('Incremental counting supports at most ' +
+                                 f'{MAX_INCREMENTAL_VARIABLES} variables.')
+            self.solution_bitmap = counting.SolutionBitmap(num_variables=len(self.variables))
+            self.solution_counts.append(self.solution_bitmap.get_num_solutions())
 
     def get_variables(self) -> Sequence[expr.Variable]:
         """Get decision variables
@@ -81,6 +107,11 @@ class Problem:
         """
 
         self.constraints.append(constraint)
+        if self.solution_bitmap is not None:
+            start_time = time.perf_counter()
+            self.solution_counts.append(self.solution_bitmap.add_constraint(
+                self.get_compiled_constraints()[-1]))
+            self.add_metric('counting_time', time.perf_counter() - start_time)
 
     def clear_constraints(self) -> None:
         """Remove constraints
@@ -89,6 +120,70 @@ class Problem:
         """
 
         self.constraints.clear()
+        self.compiled_constraints.clear()
+        self.metrics = {}
+        if self.solution_bitmap is not None:
+            self.solution_bitmap.clear()
+            self.solution_counts = [self.solution_bitmap.get_num_solutions()]
+
+    def get_compiled_constraints(self) -> Sequence[expr.CompiledExpression]:
+        """Get compiled constraints
+
+        Compiles constraints that have not been compiled yet (see
+        :class:`expressions.CompiledExpression`), so vectorized evaluation of constraints is fast.
+
+        Returns
+        -------
+        Sequence[expr.CompiledExpression]
+            The compiled constraints, in the same order as the constraints were added.
+        """
+
+        for constraint in self.constraints[len(self.compiled_constraints):]:
+            self.compiled_constraints.append(expr.CompiledExpression(constraint))
+        return self.compiled_constraints
+
+    def add_metric(self, name: str, value: float) -> None:
+        """Record a measurement
+
+        Adds the value to the metric's current value (zero if not recorded yet), so repeated
+        operations (e.g., multiple calls of a counting method) are summed up.
+
+        Parameters
+        ----------
+        name : str
+            Name of the metric.
+        value : float
+            Measured value.
+        """
+
+        self.metrics[name] = self.metrics.get(name, 0) + value
+
+    def get_metrics(self) -> Dict[str, float]:
+        """Get performance metrics
+
+        Returns measurements collected by the methods of this problem since the constraints were
+        cleared last (or since initialization). Only operations that actually ran yield metrics:
+
+        - "counting_time": Runtime (in seconds) of exact (incremental) counting, e.g.,
+          :meth:`compute_solution_fraction`.
+        - "sampling_time": Runtime (in seconds) of sampling, e.g.,
+          :meth:`estimate_solution_fraction`.
+        - "num_sampled_assignments": Number of assignments evaluated in sampling.
+        - "sampled_assignments_per_second": Throughput of sampling.
+
+        Subclasses may add further metrics (e.g., from a solver).
+
+        Returns
+        -------
+        Dict[str, float]
+            Metric names and values; suitable to be added to a dict of results.
+        """
+
+        metrics = dict(self.metrics)
+        if metrics.get('sampling_time', 0) > 0:
+            metrics['sampled_assignments_per_second'] = (metrics['num_sampled_assignments'] /
+                                                         metrics['sampling_time'])
+        return metrics
 
     def get_num_constraints(self) -> int:
         """Get number of constraints
@@ -101,14 +196,50 @@ class Problem:
 
         return len(self.constraints)
 
-    def compute_solution_fraction(self) -> float:
+    def compute_solution_fraction(self, method: str = 'auto',
+                                  num_processes: Optional[int] = None) -> float:
         """Compute fraction of solutions
 
         Exactly determine the fraction of solutions to this SMT problem under the current
         constraints, i.e., the ratio between the number of valid assignments to the binary decision
-        variables and the total number of potential assignments (2^n). The runtime of this method
-        increases exponentially with the number of decision variables (thus, see
-        :meth:`estimate_solution_fraction`).
+        variables and the total number of potential assignments (2^n). The constraints are split
+        into independent components not sharing variables (see :func:`counting.get_components`),
+        which are counted separately; unconstrained variables are accounted for analytically.
+        Each component is counted with one of the following methods:
+
+        - "enumeration": Evaluate all assignments to the component's variables, in vectorized
+          chunks (see :func:`counting.count_solutions_enumeration`) with compiled constraints
+          (see :meth:`get_compiled_constraints`). The runtime increases exponentially with the
+          number of variables (thus, see :meth:`estimate_solution_fraction`).
+        - "bdd": Build a binary decision diagram of the constraints, whose size (and thereby
+          runtime) depends on the structure of the constraints rather than the number of variables
+          (see :func:`counting.count_solutions_bdd`).
+        - "parallel": Like "enumeration", but split the assignments into sub-spaces by fixing the
+          values of some variables and enumerate the sub-spaces in a pool of `num_processes`
+          processes (see :func:`counting.count_solutions_parallel`). Cannot be used from a
+          worker of another process pool.
+        - "gray": Evaluate all assignments to the component's variables in Gray-code order, only
+          re-evaluating constraints involving the variable that changes between consecutive
+          assignments (see :func:`counting.count_solutions_gray_code`). Pure-Python alternative
+          to "enumeration" for many constraints over few variables each.
+        - "auto": If all constraints of the component are linear (like cardinality constraints,
+          see :func:`expressions.get_linear_constraints`), count combinatorially (see
+          :func:`counting.count_solutions_linear`). Else, use enumeration.
+
+        If the problem was initialized with incremental counting, the maintained number of
+        solutions is returned instead (for any method).
+
+        Parameters
+        ----------
+        method : str, optional
+            Either "auto", "enumeration", "parallel", "gray", or "bdd".
+        num_processes : Optional[int], optional
+            Number of processes for the method "parallel". If None, use the number of CPUs.
+
+        Raises
+        ------
+        ValueError
+            If the method is unknown.
 
         Returns
         -------
@@ -116,27 +247,136 @@ class Problem:
             The fraction of solutions in [0, 1].
         """
 
-        solutions = 0
-        for assignment in itertools.product([False, True], repeat=len(self.variables)):
-            # Assign
-            for i, value in enumerate(assignment):
-                self.variables[i].value = value
-            # Check SAT
-            satisfied = True
-            for constraint in self.constraints:
-                if not constraint.is_true():
-                    satisfied = False
-                    break
-            solutions = solutions + satisfied
+        if method not in ('auto', 'enumeration', 'parallel', 'gray', 'bdd'):
+            raise ValueError(f'Unknown counting method "{method}".')
+        if self.solution_bitmap is not None:
+            return self.solution_counts[-1] / 2 ** len(self.variables)
+        start_time = time.perf_counter()
+        solutions = 1
+        num_constrained_variables = 0
+        for positions, variable_indices in counting.get_components(self.constraints):
+            solutions *= self.count_component_solutions(
+                positions=positions, variable_indices=variable_indices, method=method,
+                num_processes=num_processes)
+            num_constrained_variables += len(variable_indices)
+            if solutions == 0:
+                break
+        solutions *= 2 ** (len(self.variables) - num_constrained_variables)  # free variables
+        self.add_metric('counting_time', time.perf_counter() - start_time)
         return solutions / 2 ** len(self.variables)
 
+    def get_solution_fraction_history(self) -> Sequence[float]:
+        """Get fraction of solutions after each constraint
+
+        Only available if the problem was initialized with incremental counting.
+
+        Raises
+        ------
+        ValueError
+            If incremental counting is not enabled.
+
+        Returns
+        -------
+        Sequence[float]
+            The fraction of solutions (see :meth:`compute_solution_fraction`) without constraints,
+            after adding the first constraint, after adding the second constraint, etc.
+        """
+
+        if self.solution_bitmap is None:
+            raise ValueError('History of solution fractions requires incremental counting.')
+        return [x / 2 ** len(self.variables) for x in self.solution_counts]
+
+    def count_component_solutions(self, positions: Sequence[int], variable_indices: Sequence[int],
+                                  method: str, num_processes: Optional[int] = None) -> int:
+        """Count solutions of a component of constraints
+
+        Sub-routine of :meth:`compute_solution_fraction`.
+
+        Parameters
+        ----------
+        positions : Sequence[int]
+            Positions of the component's constraints in the list of constraints.
+        variable_indices : Sequence[int]
+            Indices of the decision variables involved in the component's constraints.
+        method : str
+            Counting method; see :meth:`compute_solution_fraction`.
+        num_processes : Optional[int], optional
+            Number of processes for the method "parallel".
+
+        Returns
+        -------
+        int
+            The number of valid assignments to the component's variables, in [0, 2^k].
+        """
+
+        constraints = [self.constraints[i] for i in positions]
+        if method == 'parallel':
+            return counting.count_solutions_parallel(
+                constraints=constraints, variable_indices=variable_indices,
+                num_variables=len(self.variables), num_processes=num_processes)
+        if method == 'gray':
+            return counting.count_solutions_gray_code(constraints=constraints,
+                                                      variable_indices=variable_indices)
+        if method == 'bdd':
+            return counting.count_solutions_bdd(constraints=constraints,
+                                                variable_indices=variable_indices,
+                                                num_variables=len(self.variables))
+        if method == 'auto':
+            linear_constraints = []
+            for constraint in constraints:
+                constraint_result = expr.get_linear_constraints(constraint)
+                if constraint_result is None:
+                    break
+                linear_constraints.extend(constraint_result)
+            else:  # all constraints linear
+                component_variables = set(variable_indices)
+                variable_order = bdd.get_variable_order(constraints, len(self.variables))
+                variable_order = [x for x in variable_order if x in component_variables]
+                solutions = counting.count_solutions_linear(linear_constraints=linear_constraints,
+                                                            variable_indices=variable_order)
+                if solutions is not None:
+                    return solutions
+        compiled_constraints = self.get_compiled_constraints()
+        return counting.count_solutions_enumeration(
+            constraints=[compiled_constraints[i] for i in positions],
+            variable_indices=variable_indices, num_variables=len(self.variables))
+
+    def get_linear_constraints(self, relax: bool = False) -> Optional[List[expr.LinearConstraint]]:
+        """Get linear representation of constraints
+
+        Parameters
+        ----------
+        relax : bool, optional
+            If True, skip constraints that cannot be represented linearly, i.e., return a
+            relaxation of the problem's constraints.
+
+        Returns
+        -------
+        Optional[List[expr.LinearConstraint]]
+            The linear constraints equivalent to all constraints of the problem (see
+            :func:`expressions.get_linear_constraints`), or None if at least one constraint cannot
+            be represented linearly (and `relax` is False).
+        """
+
+        linear_constraints = []
+        for constraint in self.constraints:
+            constraint_result = expr.get_linear_constraints(constraint)
+            if constraint_result is None:
+                if relax:
+                    continue
+                return None
+            linear_constraints.extend(constraint_result)
+        return linear_constraints
+
     def estimate_solution_fraction(self, iterations: int = 1000) -> float:
         """Estimate fraction of solutions
 
         Approximates the fraction of solutions to this SMT problem (see
         :meth:`compute_solution_fraction`) by randomly sampling (with replacement) variable
         assignments for a fixed number of iterations. In a problem with many variables and strong
-        constraints, this method may return zero even if valid solutions exist.
+        constraints, this method may return zero even if valid solutions exist. Assignments are
+        sampled and evaluated in vectorized batches; the sampler is seeded from the module
+        :mod:`random`, so seeding the latter makes the estimate reproducible.
 
         Returns
         -------
@@ -144,17 +384,51 @@ class Problem:
             The fraction of solutions in [0, 1].
         """
 
-        solutions = 0
-        for _ in range(iterations):
-            assignment = [random.random() >= 0.5 for j in range(len(self.variables))]
-            # Assign
-            for i, value in enumerate(assignment):
-                self.variables[i].value = value
-            # Check SAT
-            satisfied = True
-            for constraint in self.constraints:
-                if not constraint.is_true():
-                    satisfied = False
-                    break
-            solutions = solutions + satisfied
-        return solutions / iterations
+        return self.estimate_solution_fraction_interval(max_iterations=iterations)['estimate']
+
+    def estimate_solution_fraction_interval(
+            self, max_iterations: int = 100000, batch_size: int = 1000, confidence: float = 0.95,
+            rel_precision: Optional[float] = None, interval_method: str = 'wilson',
+            seed: Optional[int] = None) -> Dict[str, float]:
+        """Estimate fraction of solutions with confidence interval
+
+        Approximates the fraction of solutions to this SMT problem like
+        :meth:`estimate_solution_fraction`, but additionally returns a confidence interval and
+        optionally stops sampling once a desired relative precision is reached (see
+        :func:`counting.estimate_solutions_sampling` for details).
+
+        Parameters
+        ----------
+        max_iterations : int, optional
+            Maximum number of sampled assignments.
+        batch_size : int, optional
+            Number of assignments sampled and evaluated at once.
+        confidence : float, optional
+            Confidence level of the interval.
+        rel_precision : Optional[float], optional
+            If not None, stop once the half-width of the interval is at most this fraction of the
+            estimate. Else, sample `max_iterations` assignments.
+        interval_method : str, optional
+            Either "wilson" or "clopper-pearson".
+        seed : Optional[int], optional
+            Seed for the random-number generator. If None, draw the seed from module
+            :mod:`random`.
+
+        Returns
+        -------
+        Dict[str, float]
+            The estimated fraction of solutions ("estimate"), the bounds of its confidence interval
+            ("ci_lower", "ci_upper"), and the number of sampled assignments ("num_samples").
+        """
+
+        if seed is None:
+            seed = random.getrandbits(64)
+        start_time = time.perf_counter()
+        result = counting.estimate_solutions_sampling(
+            constraints=self.get_compiled_constraints(), num_variables=len(self.variables),
+            max_iterations=max_iterations, batch_size=batch_size, confidence=confidence,
+            rel_precision=rel_precision, interval_method=interval_method,
+            rng=np.random.default_rng(seed))
+        self.add_metric('sampling_time', time.perf_counter() - start_time)
+        self.add_metric('num_sampled_assignments', result['num_samples'])
+        return result
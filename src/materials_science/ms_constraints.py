@@ -49,6 +49,7 @@ class MSConstraintEvaluator(metaclass=ABCMeta):
         result['num_unique_constrained_variables'] = len(unique_constrained_variables)
         result['num_constraints'] = self.problem.get_num_constraints()
         result['frac_solutions'] = frac_solutions
+        result.update(self.problem.get_metrics())  # runtimes of sampling and solving etc.
         self.problem.clear_constraints()
         return result
 
@@ -12,6 +12,7 @@ import pandas as pd
 
 from cffs import combi_expressions as expr
 from cffs import combi_solving as solv
+from cffs.expressions import ExpressionFactory
 
 
 # Super-class containing the generation and evaluation procedure for constraints, without defining
@@ -28,6 +29,10 @@ class ConstraintGenerator(metaclass=ABCMeta):
         self.min_num_variables = self.make_card_absolute(kwargs.get('min_num_variables', 2))
         self.max_num_variables = self.make_card_absolute(kwargs.get('max_num_variables', None))
         self.num_iterations = kwargs.get('num_iterations', 1)
+        # Counting solutions can be skipped if only optimization is of interest (e.g., benchmarks):
+        self.count_solutions = kwargs.get('count_solutions', True)
+        # Share expressions that are created repeatedly (e.g., global constraints) over iterations:
+        self.expression_factory = ExpressionFactory()
 
     # Sub-classes should implement this method by generating a boolean expression as constraint.
     # For generation, you should apply logical and/or arithmetic operators to the passed
@@ -50,7 +55,7 @@ class ConstraintGenerator(metaclass=ABCMeta):
                 num_variables = random.randint(self.min_num_variables, self.max_num_variables)
                 selected_variables = random.sample(self.problem.get_variables(), k=num_variables)
                 self.problem.add_constraint(self.generate(selected_variables))
-            frac_solutions = self.problem.compute_solution_fraction()
+            frac_solutions = self.problem.compute_solution_fraction() if self.count_solutions else None
             constrained_variables = self.problem.get_constrained_variables()
             unique_constrained_variables = set(constrained_variables)  # remove duplicates
             result = self.problem.optimize()  # returns dictionary with some evaluation metrics
@@ -59,6 +64,7 @@ class ConstraintGenerator(metaclass=ABCMeta):
             result['num_unique_constrained_variables'] = len(unique_constrained_variables)
             result['num_constraints'] = num_constraints
             result['frac_solutions'] = frac_solutions
+            result.update(self.problem.get_metrics())  # runtimes of counting and solving etc.
             results.append(result)
             self.problem.clear_constraints()  # iterations should be independent from each other
         return pd.DataFrame(results)
@@ -102,7 +108,8 @@ class AtLeastGenerator(ConstraintGenerator):
         # If this constraint is the first, AND it with a Global-AT-MOST constraint (AND makes sure
         # the number of constraints is not increased by two in one call of generate()).
         if (self.problem.get_num_constraints() == 0) and (self.global_at_most < len(self.problem.get_variables())):
-            global_at_most_constraint = expr.AtMost(self.problem.get_variables(), self.global_at_most)
+            global_at_most_constraint = self.expression_factory.create(
+                expr.AtMost, self.problem.get_variables(), self.global_at_most)
             result = expr.And([global_at_most_constraint, result])
         return result
 
@@ -133,19 +140,19 @@ class GlobalAtMostGenerator(ConstraintGenerator):
 
     # For each cardinality, there is exactly one way to express a global AT-MOST (one elementary
     # AT-MOST covering all variables), so we just iterate from 1 to n-1 instead of doing repeated
-    # evaluation, as there is no randomness we would mediate with repetition.
+    # evaluation, as there is no randomness we would mediate with repetition. All cardinalities are
+    # optimized with the same problem (re-using solutions that satisfy the tighter cardinalities).
     def evaluate_constraints(self) -> pd.DataFrame():
-        results = []
-        generator = AtMostGenerator(self.problem)
-        generator.min_num_constraints = 1
-        generator.max_num_constraints = 1
-        generator.min_num_variables = len(self.problem.get_variables())
-        generator.max_num_variables = len(self.problem.get_variables())
-        generator.num_iterations = 1
-        for cardinality in range(1, len(self.problem.get_variables())):
-            generator.cardinality = cardinality
-            results.append(generator.evaluate_constraints())  # one-row data frame for each cardinality
-        return pd.concat(results, ignore_index=True)  # re-number the rows (else all have index 0)
+        num_variables = len(self.problem.get_variables())
+        # Results contain fraction of solutions and metrics (runtimes of counting and solving etc.):
+        results = self.problem.optimize_cardinality_front(cardinalities=range(1, num_variables),
+                                                          counting_method='auto')
+        for result in results:  # same evaluation metrics as for other constraint types
+            result['num_variables'] = num_variables
+            result['num_constrained_variables'] = num_variables
+            result['num_unique_constrained_variables'] = num_variables
+            result['num_constraints'] = 1
+        return pd.DataFrame(results)
 
 
 # Generator for (Single-/Group-)IFF constraints (combined with a global AT-MOST constraint).
@@ -162,7 +169,8 @@ class IffGenerator(ConstraintGenerator):
         # If this constraint is the first, AND it with a Global-AT-MOST constraint (AND makes sure
         # the number of constraints is not increased by two in one call of generate()).
         if (self.problem.get_num_constraints() == 0) and (self.global_at_most < len(self.problem.get_variables())):
-            global_at_most_constraint = expr.AtMost(self.problem.get_variables(), self.global_at_most)
+            global_at_most_constraint = self.expression_factory.create(
+                expr.AtMost, self.problem.get_variables(), self.global_at_most)
             result = expr.And([global_at_most_constraint, result])
         return result
 
@@ -0,0 +1,101 @@
+"""Solver benchmark for the study with synthetic constraints
+
+Script which compares the optimization runtime of the default solving mode of
+`combi_solving.Problem` (Z3 with push/pop of solver states when clearing constraints) to other
+solving modes (Z3 with assumption literals or integer objective, branch and bound, MILP,
+preprocessing), on the constraint workloads of the synthetic-constraints pipeline.
+Should be run after preparing one or more dataset(s).
+
+Usage: python -m synthetic_constraints.syn_solver_benchmark --help
+"""
+
+import argparse
+import pathlib
+from typing import Optional
+
+import pandas as pd
+
+from cffs import combi_solving
+from cffs import milp
+from utilities import data_utility
+from synthetic_constraints import syn_constraints
+from synthetic_constraints import syn_pipeline
+
+SOLVER_MODES = {'push-pop': {'use_assumptions': False}, 'assumptions': {'use_assumptions': True},
+                'bnb': {'solver': 'bnb'}, 'milp': {'solver': 'milp'},
+                'integer': {'quality_precision': 2},  # qualities of pipeline have two digits
+                'preprocess': {'preprocess': True}}
+if not milp.is_solver_available():  # optional dependency of "cffs" (scipy >= 1.9)
+    del SOLVER_MODES['milp']
+
+# Constraint types whose generators override the generation procedure are not benchmarked
+GENERATORS = {name: generator for name, generator in syn_pipeline.GENERATORS.items()
+              if generator['func'] not in ['GlobalAtMostGenerator', 'UnconstrainedGenerator']}
+
+
+# Benchmark all solver modes for one constraint type (denoted by "generator_name") on one dataset
+# (denoted by "dataset_name", stored in "data_dir"), using the first (hard-coded) feature-quality
+# measure of the pipeline. Constraints are generated and optimized with the same procedure and seed
+# as in the pipeline, but without counting solutions. Return a data frame with one row per solver
+# mode, containing the total optimization time (not including constraint generation) and whether
+# the objective values match the first solver mode.
+def benchmark_constraint_type(generator_name: str, dataset_name: str, data_dir: pathlib.Path,
+                              n_iterations: int = 100) -> pd.DataFrame:
+    X, y = data_utility.load_dataset(dataset_name=dataset_name, directory=data_dir)
+    quality_name, quality_func = next(iter(syn_pipeline.FEATURE_QUALITIES.items()))
+    qualities = quality_func(X, y)
+    results = []
+    reference_objectives = None
+    for mode_name, mode_args in SOLVER_MODES.items():
+        problem = combi_solving.Problem(variable_names=list(X), qualities=qualities, **mode_args)
+        generator_func = getattr(syn_constraints, GENERATORS[generator_name]['func'])
+        generator_args = {'problem': problem, **GENERATORS[generator_name]['args']}
+        generator_args['num_iterations'] = n_iterations
+        generator_args['count_solutions'] = False
+        generator = generator_func(**generator_args)
+        result = generator.evaluate_constraints()  # a data frame, one row per iteration of generation
+        if reference_objectives is None:
+            reference_objectives = result['objective_value']
+        results.append({
+            'dataset_name': dataset_name, 'constraint_name': generator_name, 'quality_name': quality_name,
+            'solver_mode': mode_name, 'n_iterations': n_iterations,
+            'optimization_time': result['solve_time'].sum(),
+            'objective_equal': bool((result['objective_value'] - reference_objectives).abs().max() < 1e-6)
+        })
+    return pd.DataFrame(results)
+
+
+# Benchmark all solver modes for all (hard-coded) constraint types on all datasets (stored in
+# "data_dir"). Runs sequentially to avoid interference between measurements. Return a data frame
+# with the benchmark results and optionally save it as "output_file".
+def benchmark(data_dir: pathlib.Path, output_file: Optional[pathlib.Path] = None,
+              n_iterations: int = 100) -> pd.DataFrame:
+    if not data_dir.is_dir():
+        raise FileNotFoundError('Data directory does not exist.')
+    results = []
+    for dataset_name in data_utility.list_datasets(data_dir):
+        for generator_name in GENERATORS.keys():
+            results.append(benchmark_constraint_type(generator_name=generator_name, dataset_name=dataset_name,
+                                                     data_dir=data_dir, n_iterations=n_iterations))
+    results = pd.concat(results, ignore_index=True)
+    if output_file is not None:
+        results.to_csv(output_file, index=False)
+    return results
+
+
+# Parse some command-line arguments, run the benchmark, and print the results.
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Compares the optimization runtime of different solver modes on generated ' +
+        'constraints.', formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-d', '--data', type=pathlib.Path, default='data/openml/', dest='data_dir',
+                        help='Directory with input data. Should contain datasets with two files each (X, y).')
+    parser.add_argument('-o', '--output', type=pathlib.Path, default=None, dest='output_file',
+                        help='Output CSV file for the benchmark results (default: only print results).')
+    parser.add_argument('-i', '--iterations', type=int, default=100, dest='n_iterations',
+                        help='Number of repetitions for constraint generation (per constraint type and dataset).')
+    args = parser.parse_args()
+    print('Benchmark started.')
+    benchmark_results = benchmark(**vars(args))
+    print(benchmark_results.groupby(['constraint_name', 'solver_mode'])['optimization_time'].sum())
+    print('All objective values equal:', benchmark_results['objective_equal'].all())